@@ -2,15 +2,40 @@
 octodns provider for AutoDNS
 """
 
-from collections import defaultdict
+import json
+import sys
+from atexit import register
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from hashlib import sha256
+from importlib import import_module
 from logging import getLogger
+from logging import shutdown as shutdown_logging
+from os import _exit, fsync, makedirs, remove, replace
+from os.path import exists, join
+from re import compile as re_compile
+from socket import gethostbyname
+from threading import Condition, Lock, local
+from time import monotonic, sleep
 
+from dns.exception import DNSException
+from dns.message import make_query
+from dns.query import udp
 from requests import Session
 from requests.auth import HTTPBasicAuth
+from requests.exceptions import ConnectionError as RequestsConnectionError
+from requests.exceptions import HTTPError, Timeout
 
+from octodns.processor.filter import (
+    NameAllowlistFilter,
+    NameRejectlistFilter,
+    TypeAllowlistFilter,
+    TypeRejectlistFilter,
+)
 from octodns.provider import ProviderException
 from octodns.provider.base import BaseProvider
-from octodns.record import Record
+from octodns.provider.plan import Plan
+from octodns.record import Delete, Record
 from octodns.zone import Zone
 
 # TODO: remove __VERSION__ with the next major version release
@@ -41,23 +66,277 @@ class AutoDNSClientUnauthorized(AutoDNSClientException):
         super().__init__('Unauthorized')
 
 
+class AutoDNSJobFailed(AutoDNSClientException):
+    """
+    AutoDNSJobFailed if an asynchronous job didn't succeed
+    """
+
+    def __init__(self, job_id, status):
+        self.job_id = job_id
+        self.status = status
+        super().__init__(f'Job {job_id} finished with status {status}')
+
+
+class AutoDNSApplyFailed(ProviderException):
+    """
+    AutoDNSApplyFailed if zones applied in the background failed
+    """
+
+    def __init__(self, failures):
+        self.failures = failures
+        lines = '\n  '.join(f'{z}: {e}' for z, e in sorted(failures.items()))
+        super().__init__(f'Background apply failed for:\n  {lines}')
+
+
+class AutoDNSValidationException(ProviderException):
+    """
+    AutoDNSValidationException if records violate AutoDNS constraints
+    """
+
+    def __init__(self, zone_name, problems):
+        self.problems = problems
+        lines = '\n  '.join(problems)
+        super().__init__(f'Invalid records for {zone_name}:\n  {lines}')
+
+
+class AutoDNSConcurrencyLimiter(object):
+    """
+    AIMD limit for the number of in-flight AutoDNS API requests
+
+    The limit grows additively (by roughly one per round trip) while
+    latencies stay close to the observed baseline and is cut
+    multiplicatively on throttling (HTTP 429), failed requests or latency
+    spikes. The baseline is the lowest of the last `window` latencies of
+    the same kind of request, so it follows the API when it gets slower
+    for good.
+    """
+
+    def __init__(
+        self,
+        initial=4,
+        minimum=1,
+        maximum=32,
+        backoff=0.5,
+        latency_tolerance=2.0,
+        window=50,
+    ):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self._limit = float(max(minimum, min(initial, maximum)))
+        self._latencies = defaultdict(lambda: deque(maxlen=window))
+        self._in_flight = 0
+        self._cond = Condition()
+
+    @property
+    def limit(self):
+        """
+        Current number of requests allowed in flight
+        """
+        return int(self._limit)
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    def acquire(self):
+        with self._cond:
+            while self._in_flight >= self.limit:
+                self._cond.wait()
+            self._in_flight += 1
+
+    def release(self, latency=None, throttled=False, kind=None):
+        with self._cond:
+            self._in_flight -= 1
+            if throttled or latency is None:
+                self._decrease()
+            else:
+                latencies = self._latencies[kind]
+                baseline = min(latencies, default=latency)
+                # spikes are part of the window as well, a lasting slowdown
+                # becomes the new baseline once the fast samples age out
+                latencies.append(latency)
+                if latency > baseline * self.latency_tolerance:
+                    self._decrease()
+                else:
+                    self._limit = min(
+                        self.maximum, self._limit + 1 / self._limit
+                    )
+            self._cond.notify_all()
+
+    def _decrease(self):
+        self._limit = max(self.minimum, self._limit * self.backoff)
+
+
+class AutoDNSCodec(object):
+    """
+    JSON codec for API request and response bodies
+
+    With `auto` the fastest installed library is used, falling back to the
+    standard library. Encoding always produces bytes so bodies are
+    serialized exactly once.
+    """
+
+    PREFERENCE = ('orjson', 'msgspec', 'json')
+
+    def __init__(self, name: str = 'auto'):
+        names = self.PREFERENCE if name == 'auto' else (name,)
+        for name in names:
+            try:
+                self.dumps, self.loads = getattr(self, f'_load_{name}')()
+            except (AttributeError, ImportError):
+                continue
+            self.name = name
+            break
+        else:
+            raise AutoDNSClientException(f'Unavailable JSON codec: {name}')
+
+    @staticmethod
+    def _load_orjson():
+        orjson = import_module('orjson')
+        return orjson.dumps, orjson.loads
+
+    @staticmethod
+    def _load_msgspec():
+        msgspec_json = import_module('msgspec.json')
+        # octoDNS values are str subclasses, which msgspec only encodes
+        # through a hook
+        encoder = msgspec_json.Encoder(enc_hook=str)
+        return encoder.encode, msgspec_json.decode
+
+    @staticmethod
+    def _load_json():
+        def dumps(obj):
+            return json.dumps(
+                obj, allow_nan=False, separators=(',', ':')
+            ).encode('utf-8')
+
+        return dumps, json.loads
+
+
+class _ThreadSessions(object):
+    """
+    Per-thread copies of a Session sharing its connection pools
+
+    requests doesn't document Session as thread-safe, the urllib3 pools
+    behind its adapters are, so each thread gets its own Session mounting
+    the template's adapters.
+    """
+
+    def __init__(self, template: Session):
+        self.template = template
+        self._local = local()
+
+    def get(self):
+        try:
+            return self._local.session
+        except AttributeError:
+            pass
+        session = Session()
+        for attr in Session.__attrs__:
+            setattr(session, attr, getattr(self.template, attr))
+        session.headers = self.template.headers.copy()
+        session.cookies = self.template.cookies.copy()
+        self._local.session = session
+        return session
+
+
 class AutoDNSClient(object):
     """
     AutoDNSClient main class
+
+    Safe to share between threads: requests use per-thread sessions over a
+    shared connection pool and concurrent zone_get calls for the same zone
+    are served by a single request.
     """
 
     BASE_URL = 'https://api.autodns.com/v1'
+    DNS_TIMEOUT = 5
+    ZONE_PAGE_SIZE = 1000
+    JOB_POLL_INTERVAL = 5
+    JOB_TIMEOUT = 3600
+    JOB_PENDING = ('PENDING', 'RUNNING')
+    THROTTLE_RETRIES = 5
+    THROTTLE_BACKOFF = 1
+    THROTTLE_MAX_DELAY = 60
+    LATENCY_UNIT = 64 * 1024
+
+    log = getLogger('AutoDNSClient')
 
-    def __init__(self, session: Session, system_name_server: str):
-        self._session = session
+    def __init__(
+        self,
+        session: Session,
+        system_name_server: str,
+        limiter: AutoDNSConcurrencyLimiter = None,
+        context: str = None,
+        codec: AutoDNSCodec = None,
+        timeout: float = 60,
+    ):
+        if isinstance(session, _ThreadSessions):
+            self._sessions = session
+        else:
+            self._sessions = _ThreadSessions(session)
+        self._session = self._sessions.template
         self.system_name_server = system_name_server
+        self._limiter = limiter or AutoDNSConcurrencyLimiter()
+        self.context = context
+        self._codec = codec or AutoDNSCodec()
+        self.timeout = timeout
+        self._flights = {}
+        self._flights_lock = Lock()
+
+    def for_context(self, context: str):
+        """
+        Returns a client for another context sharing session and limiter
+        """
+        return AutoDNSClient(
+            self._sessions,
+            self.system_name_server,
+            self._limiter,
+            context,
+            self._codec,
+            self.timeout,
+        )
+
+    @property
+    def codec(self):
+        """
+        JSON codec used for request and response bodies
+        """
+        return self._codec
+
+    @property
+    def concurrency_limit(self):
+        """
+        Current adaptive limit of in-flight requests
+        """
+        return self._limiter.limit
 
     def _do(self, method, path, params=None, data=None):
         """
         Requests data from the AutoDNS API using the configured credentials
+
+        data may be passed pre-serialized as bytes, anything else is encoded
+        with the configured codec.
         """
-        url = f'{self.BASE_URL}{path}'
-        response = self._session.request(method, url, params=params, json=data)
+        headers = {}
+        if self.context is not None:
+            headers['X-Domainrobot-Context'] = self.context
+        if data is not None:
+            if not isinstance(data, bytes):
+                data = self._codec.dumps(data)
+            headers['Content-Type'] = 'application/json'
+        attempt = 0
+        response = self._request(method, path, params, data, headers)
+        while response.status_code == 429 and attempt < self.THROTTLE_RETRIES:
+            delay = self._retry_delay(response, attempt)
+            self.log.warning(
+                '_do: %s %s throttled, retrying in %.1fs', method, path, delay
+            )
+            sleep(delay)
+            attempt += 1
+            response = self._request(method, path, params, data, headers)
         if response.status_code == 401:
             raise AutoDNSClientUnauthorized()
         if response.status_code == 404:
@@ -65,14 +344,104 @@ class AutoDNSClient(object):
         response.raise_for_status()
         return response
 
+    def _request(self, method, path, params, data, headers):
+        # e.g. GET zone, GET job or POST zone _stream, latencies are only
+        # compared between requests of the same kind
+        segments = path.split('/')
+        kind = f'{method} {segments[1]}'
+        if segments[-1].startswith('_'):
+            kind = f'{kind} {segments[-1]}'
+        # timeouts and connection failures count as overload signals
+        latency = None
+        throttled = True
+        self._limiter.acquire()
+        try:
+            start = monotonic()
+            response = self._sessions.get().request(
+                method,
+                f'{self.BASE_URL}{path}',
+                params=params,
+                data=data,
+                headers=headers,
+                timeout=self.timeout,
+            )
+            # per unit of response size, so downloads of large zones don't
+            # look like spikes
+            units = 1 + len(response.content) // self.LATENCY_UNIT
+            latency = (monotonic() - start) / units
+            throttled = response.status_code == 429
+        finally:
+            self._limiter.release(latency, throttled, kind)
+        return response
+
+    def _retry_delay(self, response, attempt):
+        """
+        Seconds to wait before retrying a throttled request, Retry-After if
+        the API sent one, exponential backoff otherwise
+        """
+        try:
+            delay = float(response.headers['Retry-After'])
+        except (KeyError, ValueError):
+            delay = self.THROTTLE_BACKOFF * 2**attempt
+        return max(0, min(delay, self.THROTTLE_MAX_DELAY))
+
     def _do_json(self, method, path, params=None, data=None):
-        return self._do(method, path, params, data).json()
+        return self._codec.loads(self._do(method, path, params, data).content)
 
-    def zone_get(self, name):
+    def zone_get(self, name, system_name_server=None):
         """
         Downloads Zone configuration from AutoDNS API
+
+        Callers asking for a zone that is already being downloaded wait for
+        that request and share its (not to be modified) result.
+        """
+        system_name_server = system_name_server or self.system_name_server
+        key = (name, system_name_server)
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Future()
+        if not leader:
+            return flight.result()
+
+        try:
+            flight.set_result(
+                self._do_json('GET', f'/zone/{name}/{system_name_server}')
+            )
+        except Exception as e:
+            flight.set_exception(e)
+        finally:
+            with self._flights_lock:
+                del self._flights[key]
+        return flight.result()
+
+    def zone_list(self):
+        """
+        Lists all zones of the context, fetching them page by page
+        """
+        offset = 0
+        while True:
+            data = {'view': {'offset': offset, 'limit': self.ZONE_PAGE_SIZE}}
+            page = self._do_json('POST', '/zone/_search', data=data)
+            zones = page.get('data', [])
+            yield from zones
+            if len(zones) < self.ZONE_PAGE_SIZE:
+                return
+            offset += len(zones)
+
+    def zone_serial(self, name):
         """
-        return self._do_json('GET', f'/zone/{name}/{self.system_name_server}')
+        Looks up the SOA serial on the system name server, None on failure
+        """
+        try:
+            address = gethostbyname(self.system_name_server)
+            response = udp(
+                make_query(name, 'SOA'), address, timeout=self.DNS_TIMEOUT
+            )
+            return response.answer[0][0].serial
+        except (OSError, DNSException, IndexError):
+            return None
 
     def zone_update_records(
         self,
@@ -86,6 +455,126 @@ class AutoDNSClient(object):
         data = {'adds': records_add, 'rems': records_remove}
         return self._do_json('POST', f'/zone/{zone_name}/_stream', data=data)
 
+    @staticmethod
+    def job_id(response):
+        """
+        Returns the id of the job AutoDNS created for a request, if any
+        """
+        if response.get('status', {}).get('type') != 'NOTIFY':
+            return None
+        return response['data'][0]['id']
+
+    def job_wait(self, job_id):
+        """
+        Polls an asynchronous job until it finished, raising if it failed
+        """
+        deadline = monotonic() + self.JOB_TIMEOUT
+        while True:
+            job = self._do_json('GET', f'/job/{job_id}')['data'][0]
+            status = job['status']
+            if status not in self.JOB_PENDING:
+                break
+            if monotonic() >= deadline:
+                raise AutoDNSJobFailed(job_id, 'TIMEOUT')
+            sleep(self.JOB_POLL_INTERVAL)
+        if status != 'SUCCESS':
+            raise AutoDNSJobFailed(job_id, status)
+        return job
+
+
+class AutoDNSCheckpoint(object):
+    """
+    Durable record of which _stream payloads of an apply are committed
+
+    The file is JSON Lines: a header with the desired state's fingerprint
+    and all payloads of the apply, followed by the index of every payload
+    once AutoDNS accepted it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.header = None
+        self.committed = set()
+        self._torn_at = None
+        self._fh = None
+        self._lock = Lock()
+
+    def load(self):
+        """
+        Reads an existing checkpoint, returns False if there's none
+        """
+        if not exists(self.path):
+            return False
+        with open(self.path, 'rb') as fh:
+            data = fh.read()
+        # only newline terminated lines were completely written, what follows
+        # the last newline is a torn write
+        *lines, torn = data.split(b'\n')
+        try:
+            header = json.loads(lines[0])
+        except (IndexError, ValueError):
+            # torn or unreadable header, nothing of the apply was committed
+            return False
+        committed = set()
+        for line in lines[1:]:
+            try:
+                committed.add(int(line))
+            except ValueError:
+                continue
+        self.header = header
+        self.committed = committed
+        self._torn_at = len(data) - len(torn) if torn else None
+        return True
+
+    @staticmethod
+    def _plan_fingerprint(payloads):
+        return sha256(
+            json.dumps(payloads, sort_keys=True).encode('utf-8')
+        ).hexdigest()
+
+    def start(self, desired, payloads, split):
+        """
+        Continues a checkpoint of the same payloads or starts a new one
+        """
+        plan = self._plan_fingerprint(payloads)
+        if self.load() and self.header['plan'] == plan:
+            return
+        self.header = {
+            'desired': desired,
+            'plan': plan,
+            'payloads': payloads,
+            'split': split,
+        }
+        self.committed = set()
+        self._torn_at = None
+        with open(self.path, 'w') as fh:
+            fh.write(json.dumps(self.header))
+            fh.write('\n')
+            fh.flush()
+            fsync(fh.fileno())
+
+    def commit(self, index):
+        with self._lock:
+            if self._fh is None:
+                self._fh = open(self.path, 'a')
+                if self._torn_at is not None:
+                    # drop the torn line so it isn't merged with ours
+                    self._fh.truncate(self._torn_at)
+                    self._torn_at = None
+            self._fh.write(f'{index}\n')
+            self._fh.flush()
+            fsync(self._fh.fileno())
+            self.committed.add(index)
+
+    def close(self):
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def remove(self):
+        self.close()
+        remove(self.path)
+
 
 class AutoDNSProvider(BaseProvider):
     """
@@ -110,26 +599,316 @@ class AutoDNSProvider(BaseProvider):
             "c.ns14.net",
             "d.ns14.net",
         ),
+        max_workers=None,
+        zone_contexts={},
+        codec='auto',
+        state_file=None,
+        checkpoint_dir=None,
+        background_apply=False,
+        include_names=None,
+        include_types=None,
+        timeout=60,
+        max_concurrency=32,
         **kwargs,
     ):
         self.log = getLogger(f'AutoDNSProvider[{id}]')
         self.log.debug(
-            "__init__: username=%s, password=%s, context=%s, system_name_servers=%s",
+            "__init__: username=%s, password=%s, context=%s, system_name_servers=%s, max_workers=%s, zone_contexts=%s, codec=%s, state_file=%s, checkpoint_dir=%s, background_apply=%s, include_names=%s, include_types=%s, timeout=%s, max_concurrency=%d",
             username,
             password,
             context,
             system_name_servers,
+            max_workers,
+            zone_contexts,
+            codec,
+            state_file,
+            checkpoint_dir,
+            background_apply,
+            include_names,
+            include_types,
+            timeout,
+            max_concurrency,
         )
 
         super().__init__(id, *args, **kwargs)
 
         self.id = id
+        # by default there's a worker for every request the limiter may let
+        # through, it decides how many are actually in flight
+        self.max_workers = max_workers or max_concurrency
 
+        # the context header is set per request so that all contexts share
+        # a single session and its pool of warm connections
         sess = Session()
-        sess.headers.update({"X-Domainrobot-Context": str(context)})
         sess.auth = HTTPBasicAuth(username, password)
 
-        self.client = AutoDNSClient(sess, system_name_servers[0])
+        # shared by populate, which octoDNS may run in parallel, and apply,
+        # sized independently of the apply workers
+        limiter = AutoDNSConcurrencyLimiter(
+            initial=min(4, max_concurrency), maximum=max_concurrency
+        )
+        self.client = AutoDNSClient(
+            sess,
+            system_name_servers[0],
+            limiter,
+            str(context),
+            AutoDNSCodec(codec),
+            timeout,
+        )
+        self.zone_contexts = {
+            self._zone_key(name): str(ctx)
+            for name, ctx in zone_contexts.items()
+        }
+        self._clients = {self.client.context: self.client}
+        self._clients_lock = Lock()
+
+        self.state_file = state_file
+        self._state = {}
+        self._state_lock = Lock()
+        self._pending_fingerprints = {}
+        if state_file and exists(state_file):
+            with open(state_file) as fh:
+                self._state = json.load(fh)
+
+        self.checkpoint_dir = checkpoint_dir
+        self._resumes = {}
+        if checkpoint_dir:
+            makedirs(checkpoint_dir, exist_ok=True)
+
+        self.background_apply = background_apply
+        self._applies = {}
+        self._applies_executor = None
+
+        # the records this provider manages, everything else in the zones
+        # is neither parsed nor touched
+        self.include_names = include_names
+        self.include_types = include_types
+        self.record_filters = []
+        if include_names is not None:
+            exact, regex = self._parse_names(include_names)
+            self.record_filters.append(self._name_filter(exact, regex))
+        if include_types is not None:
+            self.record_filters.append(self._type_filter(include_types))
+        self._populate_filters = {}
+
+    @staticmethod
+    def _parse_names(patterns):
+        """
+        Splits names into exact ones and /regexes/ like octoDNS' filters
+        """
+        exact = set()
+        regex = []
+        for pattern in patterns:
+            if pattern.startswith('/'):
+                regex.append(re_compile(pattern[1:-1]))
+            else:
+                exact.add(pattern)
+        return exact, regex
+
+    @staticmethod
+    def _name_filter(exact, regex, allow=True):
+        def keep(name, _type):
+            matches = name in exact or any(r.search(name) for r in regex)
+            return matches == allow
+
+        return keep
+
+    @staticmethod
+    def _type_filter(types, allow=True):
+        types = set(types)
+
+        def keep(name, _type):
+            return (_type in types) == allow
+
+        return keep
+
+    def _filters_for(self, processors):
+        """
+        Record filters equivalent to octoDNS filter processors
+
+        Only processors that also filter the target zone can be pushed down
+        into populate, others must see the whole zone.
+        """
+        filters = []
+        for processor in processors:
+            if not getattr(processor, 'include_target', False):
+                continue
+            if isinstance(
+                processor, (TypeAllowlistFilter, TypeRejectlistFilter)
+            ):
+                filters.append(
+                    self._type_filter(
+                        processor._list,
+                        isinstance(processor, TypeAllowlistFilter),
+                    )
+                )
+            elif isinstance(
+                processor, (NameAllowlistFilter, NameRejectlistFilter)
+            ):
+                filters.append(
+                    self._name_filter(
+                        processor.exact,
+                        processor.regex,
+                        isinstance(processor, NameAllowlistFilter),
+                    )
+                )
+        return filters
+
+    def _process_desired_zone(self, desired):
+        if self.record_filters:
+            for record in desired.records:
+                if not all(
+                    keep(record.name, record._type)
+                    for keep in self.record_filters
+                ):
+                    desired.remove_record(record)
+        return super()._process_desired_zone(desired)
+
+    @staticmethod
+    def _zone_key(zone_name):
+        return zone_name if zone_name.endswith('.') else f'{zone_name}.'
+
+    def _client_for(self, zone_name):
+        """
+        Returns the client for the context the zone is managed in
+        """
+        context = self.zone_contexts.get(
+            self._zone_key(zone_name), self.client.context
+        )
+        # populate runs in parallel, a duplicate client would defeat its
+        # single-flight zone_get
+        with self._clients_lock:
+            try:
+                return self._clients[context]
+            except KeyError:
+                client = self.client.for_context(context)
+                self._clients[context] = client
+                return client
+
+    def _fingerprint(self, desired, processors):
+        """
+        Digest of the desired records, the processors applied to them and
+        the records this provider manages
+        """
+        data = [
+            (record.name, record._type, record.data)
+            for record in desired.records
+        ]
+        data.sort(key=lambda d: d[:2])
+        # with their configuration, e.g. widening a TypeAllowlistFilter
+        # changes which remote records have to be reconciled
+        data.append(
+            sorted(
+                (
+                    [type(p).__name__, p.id, sorted(vars(p).items())]
+                    for p in processors
+                ),
+                key=lambda c: c[:2],
+            )
+        )
+        # changing the filters changes which remote records are managed even
+        # if the desired records stay the same
+        data.append(
+            [
+                None if include is None else sorted(include)
+                for include in (self.include_names, self.include_types)
+            ]
+        )
+        return sha256(
+            json.dumps(
+                data, sort_keys=True, default=self._fingerprint_default
+            ).encode('utf-8')
+        ).hexdigest()
+
+    @staticmethod
+    def _fingerprint_default(value):
+        # stable forms of what processors hold, e.g. sets and compiled
+        # regular expressions
+        if isinstance(value, (set, frozenset)):
+            return sorted(value, key=str)
+        pattern = getattr(value, 'pattern', None)
+        if isinstance(pattern, str):
+            return pattern
+        return str(value)
+
+    def _record_state(self, zone_name, fingerprint):
+        """
+        Remembers that the zone matches fingerprint at its current serial
+        """
+        serial = self._client_for(zone_name).zone_serial(zone_name)
+        if serial is None:
+            return
+        with self._state_lock:
+            self._state[zone_name] = {
+                'fingerprint': fingerprint,
+                'serial': serial,
+            }
+            tmp = f'{self.state_file}.tmp'
+            with open(tmp, 'w') as fh:
+                json.dump(self._state, fh, indent=2, sort_keys=True)
+            replace(tmp, self.state_file)
+
+    def _checkpoint(self, zone_name):
+        return AutoDNSCheckpoint(join(self.checkpoint_dir, f'{zone_name}json'))
+
+    def plan(self, desired, processors=[], *args, **kwargs):
+        self._populate_filters[desired.name] = self._filters_for(processors)
+        try:
+            return self._plan(desired, processors, *args, **kwargs)
+        finally:
+            self._populate_filters.pop(desired.name, None)
+
+    def _plan(self, desired, processors, *args, **kwargs):
+        if not self.state_file and not self.checkpoint_dir:
+            return super().plan(desired, processors, *args, **kwargs)
+
+        fingerprint = self._fingerprint(desired, processors)
+
+        if self.checkpoint_dir:
+            checkpoint = self._checkpoint(desired.name)
+            if checkpoint.load():
+                if checkpoint.header['desired'] == fingerprint:
+                    # an interrupted apply of this very desired state, pick
+                    # it up without populating the zone again
+                    total = len(checkpoint.header['payloads'])
+                    committed = len(checkpoint.committed)
+                    self.log.info(
+                        'plan: %s resuming apply, %d of %d batches committed',
+                        desired.name,
+                        committed,
+                        total,
+                    )
+                    self._resumes[desired.name] = checkpoint
+                    meta = {
+                        'autodns_resume': {
+                            'committed': committed,
+                            'total': total,
+                        }
+                    }
+                    existing = Zone(desired.name, desired.sub_zones)
+                    return Plan(existing, desired, [], True, meta=meta)
+                # the desired state changed, the plan will be a new one
+                checkpoint.remove()
+
+        state = self._state.get(desired.name)
+        if state and state['fingerprint'] == fingerprint:
+            serial = self._client_for(desired.name).zone_serial(desired.name)
+            if serial == state['serial']:
+                self.log.info(
+                    'plan: %s unchanged since serial %s, skipping',
+                    desired.name,
+                    serial,
+                )
+                return None
+
+        plan = super().plan(desired, processors, *args, **kwargs)
+        if plan is None:
+            # remote already matches desired
+            if self.state_file:
+                self._record_state(desired.name, fingerprint)
+        else:
+            self._pending_fingerprints[desired.name] = fingerprint
+        return plan
 
     def _data_for_MX(self, _type, records, default_ttl):
         values = []
@@ -186,9 +965,10 @@ class AutoDNSProvider(BaseProvider):
     def _data_for_CAA(self, _type, records, default_ttl):
         values = []
         for record in records:
-            flags = record.get('value').split(' ')[0]
-            tag = record.get('value').split(' ')[1]
-            value = record.get('value').split(' ')[2].strip('"')
+            # the value is quoted and may contain spaces, e.g.
+            # 0 issue "ca.example.net; account=230123"
+            flags, tag, value = record.get('value').split(' ', 2)
+            value = value.strip('"')
             values.append({'flags': flags, 'tag': tag, 'value': value})
         try:
             _ttl = records[0]["ttl"]
@@ -255,50 +1035,258 @@ class AutoDNSProvider(BaseProvider):
 
     _params_for_TXT = _params_for_MULTIPLE
 
-    def _apply_Create(self, zone_name, change):
+    # longest TXT value accepted by AutoDNS
+    TXT_MAX_LENGTH = 4096
+
+    def _validate_params(self, zone_name, params):
+        """
+        Checks a _stream record against AutoDNS' constraints, yields problems
+        """
+        name = params['name']
+        # the length limit is for the full name, without the trailing dot
+        fqdn = f'{name}.{zone_name}'.strip('.')
+        if len(fqdn) > 253 or any(len(label) > 63 for label in name.split('.')):
+            yield 'name too long'
+        ttl = params['ttl']
+        if not isinstance(ttl, int) or ttl <= 0:
+            yield f'invalid ttl {ttl}'
+        validate = getattr(self, f'_validate_{params["type"]}', None)
+        if validate:
+            yield from validate(params)
+
+    def _validate_TARGET(self, params):
+        if not params['value'].endswith('.'):
+            yield f'target {params["value"]} has no trailing dot'
+
+    _validate_ALIAS = _validate_TARGET
+    _validate_CNAME = _validate_TARGET
+    _validate_MX = _validate_TARGET
+    _validate_NS = _validate_TARGET
+
+    def _validate_CAA(self, params):
+        flags, tag, value = params['value'].split(' ', 2)
+        if not 0 <= int(flags) <= 255:
+            yield f'CAA flags {flags} out of range'
+        if not tag.isalnum():
+            yield f'invalid CAA tag {tag}'
+        # populate strips the surrounding quotes, unescaped quotes inside
+        # wouldn't survive that
+        inner = value[1:-1]
+        if '"' in inner:
+            yield f'CAA value {inner} contains quotes'
+
+    def _validate_SRV(self, params):
+        weight, port, target = params['value'].split(' ')
+        for field, value in (
+            ('priority', params['pref']),
+            ('weight', weight),
+            ('port', port),
+        ):
+            if not 0 <= int(value) <= 65535:
+                yield f'SRV {field} {value} out of range'
+        if not target.endswith('.'):
+            yield f'SRV target {target} has no trailing dot'
+
+    def _validate_TXT(self, params):
+        if len(params['value']) > self.TXT_MAX_LENGTH:
+            yield f'TXT value longer than {self.TXT_MAX_LENGTH} characters'
+
+    def _validate(self, zone_name, records):
+        """
+        Validates all records before anything is sent, raising every problem
+        """
+        problems = []
+        for params in records:
+            for problem in self._validate_params(zone_name, params):
+                problems.append(
+                    f'{params["type"]} "{params["name"]}": {problem}'
+                )
+        if problems:
+            raise AutoDNSValidationException(zone_name, problems)
+
+    def _records_for_Create(self, change):
         new = change.new
         params_for = getattr(self, f'_params_for_{new._type}')
+        return [], list(params_for(new))
 
-        for params in params_for(new):
-            self.client.zone_update_records(
-                zone_name, records_remove=[], records_add=[params]
-            )
-
-    def _apply_Update(self, zone_name, change):
+    def _records_for_Update(self, change):
         # It's way simpler to delete-then-recreate than to update
-        self._apply_Delete(zone_name, change)
-        self._apply_Create(zone_name, change)
+        rems, _ = self._records_for_Delete(change)
+        _, adds = self._records_for_Create(change)
+        return rems, adds
 
-    def _apply_Delete(self, zone_name, change):
+    def _records_for_Delete(self, change):
         existing = change.existing
-
         params_for = getattr(self, f'_params_for_{existing._type}')
+        return list(params_for(existing)), []
+
+    def _submit(self, zone_name, payloads, checkpoint=None):
+        """
+        Sends the indexed _stream payloads, in parallel unless max_workers
+        is 1, recording each in checkpoint once committed
+        """
+        client = self._client_for(zone_name)
 
-        for params in params_for(existing):
-            self.client.zone_update_records(
-                zone_name, records_add=[], records_remove=[params]
+        def update(indexed):
+            index, payload = indexed
+            response = client.zone_update_records(
+                zone_name,
+                records_add=payload['adds'],
+                records_remove=payload['rems'],
             )
+            job_id = client.job_id(response)
+            if job_id is not None:
+                client.job_wait(job_id)
+            if checkpoint:
+                checkpoint.commit(index)
+
+        if self.max_workers > 1 and len(payloads) > 1:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                list(executor.map(update, payloads))
+        else:
+            for payload in payloads:
+                update(payload)
+
+    def wait_for_applies(self):
+        """
+        Waits for all zones applied in the background
+
+        Returns the names of the zones that were applied, raises
+        AutoDNSApplyFailed listing every zone that failed.
+        """
+        with _background_lock:
+            _background_providers.discard(self)
+            applies, self._applies = self._applies, {}
+        applied = []
+        failures = {}
+        for zone_name, future in applies.items():
+            e = future.exception()
+            if e is None:
+                self.log.info('wait_for_applies: %s applied', zone_name)
+                applied.append(zone_name)
+            else:
+                self.log.error('wait_for_applies: %s failed: %s', zone_name, e)
+                failures[zone_name] = e
+        if failures:
+            raise AutoDNSApplyFailed(failures)
+        return applied
 
     def _apply(self, plan):
+        if not self.background_apply:
+            return self._apply_zone(plan)
+
+        if self._applies_executor is None:
+            self._applies_executor = ThreadPoolExecutor(
+                thread_name_prefix=f'AutoDNSProvider[{self.id}]'
+            )
+        zone_name = plan.desired.name
+        with _background_lock:
+            self._applies[zone_name] = self._applies_executor.submit(
+                self._apply_zone, plan
+            )
+            _background_providers.add(self)
+        self.log.info('_apply: zone=%s submitted in the background', zone_name)
+
+    @staticmethod
+    def _transient(e):
+        """
+        Whether a failed request is worth resuming as is: timeouts,
+        connection errors, throttling and server errors
+        """
+        if isinstance(e, HTTPError):
+            status = getattr(e.response, 'status_code', None)
+            return status is not None and (status == 429 or status >= 500)
+        return isinstance(e, (RequestsConnectionError, Timeout))
+
+    def _apply_zone(self, plan):
         desired = plan.desired
         changes = plan.changes
         self.log.debug(
             '_apply: zone=%s, len(changes)=%d', desired.name, len(changes)
         )
 
-        for change in changes:
-            class_name = change.__class__.__name__
-            getattr(self, f'_apply_{class_name}')(desired.name, change)
+        fingerprint = self._pending_fingerprints.pop(desired.name, None)
+        checkpoint = self._resumes.pop(desired.name, None)
+        if checkpoint:
+            fingerprint = checkpoint.header['desired']
+            payloads = checkpoint.header['payloads']
+            split = checkpoint.header['split']
+        else:
+            # one payload per change so that updates are applied atomically,
+            # deletes first
+            changes = sorted(changes, key=lambda c: not isinstance(c, Delete))
+            payloads = []
+            for change in changes:
+                class_name = change.__class__.__name__
+                rems, adds = getattr(self, f'_records_for_{class_name}')(change)
+                payloads.append({'adds': adds, 'rems': rems})
+
+            # removals are existing records, only what we add needs checking
+            self._validate(
+                desired.name, [a for p in payloads for a in p['adds']]
+            )
+
+            split = sum(1 for c in changes if isinstance(c, Delete))
+            if self.checkpoint_dir:
+                checkpoint = self._checkpoint(desired.name)
+                checkpoint.start(fingerprint, payloads, split)
+
+        committed = checkpoint.committed if checkpoint else set()
+        pending = [
+            (i, payload)
+            for i, payload in enumerate(payloads)
+            if i not in committed
+        ]
+        # deletes go first so that type changes, e.g. CNAME <-> A, don't
+        # conflict while requests are in flight concurrently
+        try:
+            self._submit(
+                desired.name, [p for p in pending if p[0] < split], checkpoint
+            )
+            self._submit(
+                desired.name, [p for p in pending if p[0] >= split], checkpoint
+            )
+        except Exception as e:
+            if checkpoint and not self._transient(e):
+                # resuming would replay the rejected payload on every run,
+                # the next plan reads the zone again instead
+                self.log.warning(
+                    '_apply: zone=%s, discarding checkpoint after %s',
+                    desired.name,
+                    e,
+                )
+                checkpoint.remove()
+            raise
+        finally:
+            if checkpoint:
+                checkpoint.close()
+        if checkpoint:
+            checkpoint.remove()
+        self.log.debug(
+            '_apply: zone=%s, concurrency_limit=%d',
+            desired.name,
+            self._client_for(desired.name).concurrency_limit,
+        )
+
+        if fingerprint and self.state_file:
+            self._record_state(desired.name, fingerprint)
 
     def populate(self, zone: Zone, target=False, lenient=False):
         self.log.debug('populate: zone=%s', zone.name)
         values = defaultdict(lambda: defaultdict(list))
-        zone_data = self.client.zone_get(zone.name)
+        zone_data = self._client_for(zone.name).zone_get(zone.name)
 
         default_ttl = zone_data["data"][0]["soa"]["ttl"]
 
+        # AutoDNS has no record level queries so filters apply while parsing
+        filters = self.record_filters + self._populate_filters.get(
+            zone.name, []
+        )
+
         for record in zone_data["data"][0]["resourceRecords"]:
             _type = record['type']
+            if not all(keep(record['name'], _type) for keep in filters):
+                continue
             if _type not in self.SUPPORTS:
                 self.log.warning(
                     'populate: skipping unsupported %s record', _type
@@ -333,3 +1321,37 @@ class AutoDNSProvider(BaseProvider):
                 zone.add_record(record, lenient=lenient)
 
         self.log.info('populate:   found %s records', len(zone.records))
+
+
+# providers with background applies nobody waited for yet, held until they
+# were so that no failure goes unreported, and released afterwards
+_background_providers = set()
+_background_lock = Lock()
+
+
+def _wait_for_background_applies():
+    """
+    Waits for the background applies of all providers at exit
+
+    Every failure is logged, if there were any the process exits with status
+    1 once all providers are done.
+    """
+    with _background_lock:
+        providers = sorted(_background_providers, key=lambda p: p.id)
+    failed = False
+    for provider in providers:
+        try:
+            provider.wait_for_applies()
+        except AutoDNSApplyFailed:
+            failed = True
+    if failed:
+        # exceptions raised by exit handlers don't change the exit status,
+        # octodns-sync --doit mustn't report success. Registered on import,
+        # the handlers of everything imported later have already run.
+        shutdown_logging()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        _exit(1)
+
+
+register(_wait_for_background_applies)
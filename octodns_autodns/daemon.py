@@ -0,0 +1,214 @@
+'''
+octoDNS AutoDNS reconcile daemon
+'''
+
+from logging import getLogger
+from os import scandir
+from os.path import basename, dirname, getmtime, isdir
+from signal import SIGTERM, signal
+from threading import Event
+from time import monotonic
+
+from octodns.cmds.args import ArgumentParser
+from octodns.manager import Manager
+from octodns.provider.yaml import YamlProvider
+
+from . import AutoDNSApplyFailed, AutoDNSProvider
+
+
+class AutoDNSDaemon(object):
+    '''
+    Keeps a Manager, and with it the AutoDNS sessions, alive between runs
+
+    The config file and the directories of all YamlProvider sources are
+    polled for changes and only the zones whose files changed are planned
+    and applied. Changes to the config file rebuild the Manager and sync all
+    zones, as does a periodic full sync that catches changes made outside
+    of octoDNS.
+    '''
+
+    log = getLogger('AutoDNSDaemon')
+
+    def __init__(
+        self,
+        config_file,
+        dry_run=True,
+        force=False,
+        interval=30,
+        full_interval=3600,
+    ):
+        self.config_file = config_file
+        self.dry_run = dry_run
+        self.force = force
+        self.interval = interval
+        self.full_interval = full_interval
+        self._stop = Event()
+        self._load()
+
+    def _load(self):
+        self.manager = Manager(self.config_file)
+        self.autodns = [
+            p
+            for p in self.manager.providers.values()
+            if isinstance(p, AutoDNSProvider)
+        ]
+        self.log.info(
+            '_load: autodns providers=%s', [p.id for p in self.autodns]
+        )
+        self._mtimes = self._scan()
+        self._last_full = None
+
+    def _scan(self):
+        '''
+        Returns the mtimes of the config file and all source YAML files
+        '''
+        mtimes = {self.config_file: getmtime(self.config_file)}
+        for provider in self.manager.providers.values():
+            if isinstance(provider, YamlProvider) and isdir(provider.directory):
+                self._scan_directory(provider.directory, mtimes)
+        return mtimes
+
+    def _scan_directory(self, directory, mtimes):
+        for entry in scandir(directory):
+            if entry.is_dir():
+                self._scan_directory(entry.path, mtimes)
+            elif entry.name.endswith('.yaml'):
+                mtimes[entry.path] = entry.stat().st_mtime
+
+    def _zone_for(self, path):
+        '''
+        Maps a source file to its zone, None if it can't be determined
+        '''
+        zones = self.manager.config['zones']
+        # zone files, e.g. unit.tests.yaml, and split zone directories, e.g.
+        # unit.tests./www.yaml
+        for candidate in (basename(path)[:-4], basename(dirname(path))):
+            if candidate in zones:
+                return candidate
+        return None
+
+    def changed_zones(self):
+        '''
+        Returns the zones changed since the last call, None meaning all zones
+        '''
+        before = self._mtimes
+        after = self._scan()
+        changed = [
+            p for p in set(before) | set(after) if before.get(p) != after.get(p)
+        ]
+        if self.config_file in changed:
+            self.log.info('changed_zones: config changed, reloading')
+            # _load records the new mtimes, until it succeeds the change is
+            # picked up, and the reload retried, on every tick
+            self._load()
+            return None
+        self._mtimes = after
+        zones = set()
+        for path in changed:
+            zone = self._zone_for(path)
+            if zone is None:
+                self.log.info('changed_zones: unmapped change %s', path)
+                return None
+            zones.add(zone)
+        return sorted(zones)
+
+    def reconcile(self, zones=None):
+        '''
+        Plans and applies the given zones, all zones if zones is None
+        '''
+        self.log.info('reconcile: zones=%s', zones or 'all')
+        self.manager.sync(
+            eligible_zones=zones or [], dry_run=self.dry_run, force=self.force
+        )
+        # collect zones applied in the background before the next round
+        failures = []
+        for provider in self.autodns:
+            try:
+                provider.wait_for_applies()
+            except AutoDNSApplyFailed as e:
+                failures.append(e)
+        if failures:
+            raise failures[0]
+
+    def tick(self):
+        now = monotonic()
+        # config changes are looked for first so that a full sync doesn't
+        # run with, and swallow the change to, a stale config
+        zones = self.changed_zones()
+        if (
+            zones is None
+            or self._last_full is None
+            or now - self._last_full >= self.full_interval
+        ):
+            self.reconcile()
+            self._last_full = now
+        elif zones:
+            self.reconcile(zones)
+
+    def run(self):
+        self.log.info(
+            'run: interval=%ds, full_interval=%ds, dry_run=%s',
+            self.interval,
+            self.full_interval,
+            self.dry_run,
+        )
+        while True:
+            try:
+                self.tick()
+            except Exception:
+                # keep serving, the next change or full sync will retry
+                self.log.exception('run: reconcile failed')
+            if self._stop.wait(self.interval):
+                break
+
+    def stop(self):
+        self._stop.set()
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split('\n')[1])
+
+    parser.add_argument(
+        '--config-file',
+        required=True,
+        help='The Manager configuration file to use',
+    )
+    parser.add_argument(
+        '--doit',
+        action='store_true',
+        default=False,
+        help='Whether to take action or just show what would change',
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        default=False,
+        help='Acknowledge that significant changes are being made and do them',
+    )
+    parser.add_argument(
+        '--interval',
+        type=int,
+        default=30,
+        help='Seconds between checks for changed config and source files',
+    )
+    parser.add_argument(
+        '--full-interval',
+        type=int,
+        default=3600,
+        help='Seconds between syncs of all zones, catches remote changes',
+    )
+
+    args = parser.parse_args()
+
+    daemon = AutoDNSDaemon(
+        args.config_file,
+        dry_run=not args.doit,
+        force=args.force,
+        interval=args.interval,
+        full_interval=args.full_interval,
+    )
+    signal(SIGTERM, lambda *_: daemon.stop())
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        daemon.stop()
@@ -0,0 +1,165 @@
+'''
+Export the resource records of all AutoDNS zones as JSON Lines
+'''
+
+import gzip
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from logging import getLogger
+from os import environ, makedirs, replace
+from os.path import exists, join
+
+from requests import Session
+from requests.auth import HTTPBasicAuth
+
+from octodns.cmds.args import ArgumentParser
+
+from . import AutoDNSClient, AutoDNSConcurrencyLimiter
+
+
+class AutoDNSExporter(object):
+    '''
+    Streams the raw resource records of zones into gzipped JSON Lines files
+
+    Every zone is written to `<output_dir>/<zone>.jsonl.gz`, one record per
+    line. Files are written under a temporary name and renamed once
+    complete, zones that already have a file are skipped so an interrupted
+    export resumes where it stopped. At most `workers` zones are fetched,
+    and held in memory, at a time.
+    '''
+
+    log = getLogger('AutoDNSExporter')
+
+    def __init__(self, client: AutoDNSClient, output_dir, workers=8):
+        self.client = client
+        self.output_dir = output_dir
+        self.workers = workers
+
+    def _path(self, name):
+        return join(self.output_dir, f'{name}.jsonl.gz')
+
+    def export_zone(self, name, system_name_server=None):
+        '''
+        Writes a single zone, returns the number of records written
+        '''
+        zone_data = self.client.zone_get(name, system_name_server)
+        records = zone_data['data'][0]['resourceRecords']
+        dumps = self.client.codec.dumps
+        path = self._path(name)
+        tmp = f'{path}.part'
+        with gzip.open(tmp, 'wb') as fh:
+            for record in records:
+                fh.write(dumps(record))
+                fh.write(b'\n')
+        replace(tmp, path)
+        return len(records)
+
+    def export(self, zones=None):
+        '''
+        Exports the given zone names, all zones of the context if None
+
+        Returns a dict of zone name to the number of records written, None
+        for zones skipped because they had already been exported and the
+        exception for zones that failed. A failed zone doesn't stop the
+        others, re-running the export retries it.
+        '''
+        makedirs(self.output_dir, exist_ok=True)
+        if zones is None:
+            zones = (
+                (z['origin'], z.get('virtualNameServer'))
+                for z in self.client.zone_list()
+            )
+        else:
+            zones = ((name, None) for name in zones)
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pending = {}
+            for name, system_name_server in zones:
+                if exists(self._path(name)):
+                    self.log.debug('export: %s already exported', name)
+                    results[name] = None
+                    continue
+                # only keep a bounded number of zones in flight
+                while len(pending) >= self.workers:
+                    self._collect(pending, results)
+                future = executor.submit(
+                    self.export_zone, name, system_name_server
+                )
+                pending[future] = name
+            while pending:
+                self._collect(pending, results)
+
+        self.log.info(
+            'export: %d zones exported, %d skipped, %d failed',
+            sum(1 for r in results.values() if isinstance(r, int)),
+            sum(1 for r in results.values() if r is None),
+            sum(1 for r in results.values() if isinstance(r, Exception)),
+        )
+        return results
+
+    def _collect(self, pending, results):
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            name = pending.pop(future)
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                results[name] = e
+                self.log.error('export: %s failed: %s', name, e)
+                continue
+            self.log.info('export: %s, %d records', name, results[name])
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split('\n')[1])
+
+    parser.add_argument(
+        '--output-dir',
+        required=True,
+        help='Directory the <zone>.jsonl.gz files are written to',
+    )
+    parser.add_argument(
+        '--context', default='4', help='The AutoDNS context to export'
+    )
+    parser.add_argument(
+        '--system-name-server',
+        default='a.ns14.net',
+        help='System name server of zones that do not report one',
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=8,
+        help='Maximum number of zones fetched concurrently',
+    )
+    parser.add_argument(
+        'zone',
+        nargs='*',
+        default=None,
+        help='Limit the export to the specified zone(s)',
+    )
+
+    args = parser.parse_args()
+
+    missing = [
+        name
+        for name in ('AUTODNS_USERNAME', 'AUTODNS_PASSWORD')
+        if not environ.get(name)
+    ]
+    if missing:
+        parser.error(f'{" and ".join(missing)} must be set in the environment')
+
+    sess = Session()
+    sess.auth = HTTPBasicAuth(
+        environ['AUTODNS_USERNAME'], environ['AUTODNS_PASSWORD']
+    )
+    limiter = AutoDNSConcurrencyLimiter(
+        initial=min(4, args.workers), maximum=args.workers
+    )
+    client = AutoDNSClient(sess, args.system_name_server, limiter, args.context)
+
+    exporter = AutoDNSExporter(client, args.output_dir, workers=args.workers)
+    results = exporter.export(args.zone or None)
+    failed = sorted(n for n, r in results.items() if isinstance(r, Exception))
+    if failed:
+        parser.exit(1, f'Export failed for: {", ".join(failed)}\n')
@@ -26,6 +26,12 @@ setup(
     author='Christoph Sieber, Martin Neubert, Martin Schurz, Christopher Grau',
     author_email='christoph.sieber@telekom.de, martin.neubert@telekom.de, martin.schurz@telekom.de, c.grau@telekom.de',
     description=description,
+    entry_points={
+        'console_scripts': (
+            'octodns-autodns-daemon = octodns_autodns.daemon:main',
+            'octodns-autodns-export = octodns_autodns.export:main',
+        )
+    },
     extras_require={
         'dev': tests_require
         + (
@@ -40,9 +46,10 @@ setup(
             'readme_renderer[md]>=26.0',
             'twine>=3.4.2',
         ),
+        'fast': ('orjson>=3.9.0',),
         'test': tests_require,
     },
-    install_requires=('octodns>=1.0.0', 'requests>=2.32.3'),
+    install_requires=('dnspython>=2.2.1', 'octodns>=1.0.0', 'requests>=2.32.3'),
     license='MIT',
     long_description=long_description,
     long_description_content_type='text/markdown',
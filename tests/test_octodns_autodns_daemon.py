@@ -0,0 +1,197 @@
+#
+#
+#
+
+from os import makedirs, utime
+from os.path import getmtime, join
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import call, patch
+
+from yaml import YAMLError
+
+from octodns.manager import Manager
+
+from octodns_autodns import AutoDNSApplyFailed
+from octodns_autodns.daemon import AutoDNSDaemon, main
+
+CONFIG = '''---
+providers:
+  config:
+    class: octodns.provider.yaml.YamlProvider
+    directory: {directory}
+  autodns:
+    class: octodns_autodns.AutoDNSProvider
+    username: username
+    password: password
+    context: 4
+zones:
+  unit.tests.:
+    sources:
+      - config
+    targets:
+      - autodns
+  other.tests.:
+    sources:
+      - config
+    targets:
+      - autodns
+'''
+
+
+class TestAutoDNSDaemon(TestCase):
+    def setUp(self):
+        self._tmp = TemporaryDirectory()
+        self.directory = join(self._tmp.name, 'config')
+        makedirs(join(self.directory, 'other.tests.'))
+        self.config_file = join(self._tmp.name, 'config.yaml')
+        with open(self.config_file, 'w') as fh:
+            fh.write(CONFIG.format(directory=self.directory))
+        for path in ('unit.tests.yaml', 'other.tests./www.yaml', 'README'):
+            with open(join(self.directory, path), 'w') as fh:
+                fh.write('--- {}\n')
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def touch(self, *path):
+        path = join(*path)
+        mtime = getmtime(path) + 10
+        utime(path, (mtime, mtime))
+
+    @patch.object(Manager, 'sync')
+    def test_tick(self, sync):
+        daemon = AutoDNSDaemon(self.config_file, dry_run=False)
+        manager = daemon.manager
+        self.assertIn('autodns', manager.providers)
+
+        # the first tick syncs everything
+        daemon.tick()
+        sync.assert_called_once_with(
+            eligible_zones=[], dry_run=False, force=False
+        )
+
+        # nothing changed, nothing to do
+        sync.reset_mock()
+        daemon.tick()
+        sync.assert_not_called()
+
+        # changed zone files only sync their zones
+        self.touch(self.directory, 'unit.tests.yaml')
+        self.touch(self.directory, 'other.tests.', 'www.yaml')
+        daemon.tick()
+        sync.assert_called_once_with(
+            eligible_zones=['other.tests.', 'unit.tests.'],
+            dry_run=False,
+            force=False,
+        )
+        # with the same, warm, manager
+        self.assertIs(manager, daemon.manager)
+
+        # files that can't be mapped to a zone sync everything
+        sync.reset_mock()
+        with open(join(self.directory, 'unknown.yaml'), 'w') as fh:
+            fh.write('--- {}\n')
+        daemon.tick()
+        sync.assert_called_once_with(
+            eligible_zones=[], dry_run=False, force=False
+        )
+
+        # config changes reload the manager and sync everything
+        sync.reset_mock()
+        self.touch(self.config_file)
+        daemon.tick()
+        sync.assert_called_once_with(
+            eligible_zones=[], dry_run=False, force=False
+        )
+        self.assertIsNot(manager, daemon.manager)
+
+        # as does the periodic full sync
+        sync.reset_mock()
+        daemon.full_interval = 0
+        daemon.tick()
+        sync.assert_called_once_with(
+            eligible_zones=[], dry_run=False, force=False
+        )
+
+    @patch.object(Manager, 'sync')
+    def test_run(self, sync):
+        daemon = AutoDNSDaemon(self.config_file, interval=0)
+
+        ticks = []
+
+        def tick():
+            ticks.append(True)
+            if len(ticks) < 3:
+                raise Exception('boom')
+            daemon.stop()
+
+        # failures, the first tick's included, are logged and retried
+        with patch.object(daemon, 'tick', side_effect=tick):
+            with self.assertLogs('AutoDNSDaemon', 'ERROR') as logs:
+                daemon.run()
+        self.assertEqual(3, len(ticks))
+        self.assertEqual(2, len(logs.output))
+        self.assertIn('run: reconcile failed', logs.output[0])
+
+    @patch.object(Manager, 'sync')
+    def test_background_failures(self, sync):
+        daemon = AutoDNSDaemon(self.config_file)
+        provider = daemon.autodns[0]
+        failure = AutoDNSApplyFailed({'unit.tests.': Exception('boom')})
+        with patch.object(
+            provider, 'wait_for_applies', side_effect=[[], failure]
+        ):
+            daemon.reconcile()
+            # failed background applies fail the round
+            with self.assertRaises(AutoDNSApplyFailed):
+                daemon.reconcile()
+
+    @patch.object(Manager, 'sync')
+    def test_failed_reload(self, sync):
+        daemon = AutoDNSDaemon(self.config_file)
+        daemon.tick()
+        manager = daemon.manager
+        sync.reset_mock()
+
+        # a broken config keeps the old manager and is retried every tick
+        with open(self.config_file) as fh:
+            config = fh.read()
+        with open(self.config_file, 'w') as fh:
+            fh.write('--- [\n')
+        self.touch(self.config_file)
+        for _ in range(2):
+            with self.assertRaises(YAMLError):
+                daemon.tick()
+        self.assertIs(manager, daemon.manager)
+        sync.assert_not_called()
+
+        # until it's fixed
+        with open(self.config_file, 'w') as fh:
+            fh.write(config)
+        self.touch(self.config_file)
+        daemon.tick()
+        self.assertIsNot(manager, daemon.manager)
+        sync.assert_called_once_with(
+            eligible_zones=[], dry_run=True, force=False
+        )
+
+    @patch.object(AutoDNSDaemon, 'run', side_effect=KeyboardInterrupt)
+    @patch.object(AutoDNSDaemon, 'stop')
+    def test_main(self, stop, run):
+        argv = [
+            'octodns-autodns-daemon',
+            '--config-file',
+            self.config_file,
+            '--interval',
+            '5',
+        ]
+        with patch('sys.argv', argv), patch(
+            'octodns_autodns.daemon.signal'
+        ) as signal:
+            main()
+        run.assert_called_once_with()
+        self.assertEqual([call()], stop.call_args_list)
+        # SIGTERM stops the daemon as well
+        signal.call_args[0][1]()
+        self.assertEqual([call(), call()], stop.call_args_list)
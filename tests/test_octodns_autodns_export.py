@@ -0,0 +1,189 @@
+#
+#
+#
+
+import gzip
+import json
+from io import StringIO
+from os.path import exists, join
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+from requests import HTTPError, Session
+from requests_mock import ANY
+from requests_mock import mock as requests_mock
+
+from octodns_autodns import AutoDNSClient
+from octodns_autodns.export import AutoDNSExporter, main
+
+
+def zone(*names):
+    return json.dumps(
+        {
+            'data': [
+                {
+                    'soa': {'ttl': 3600},
+                    'resourceRecords': [
+                        {'name': n, 'ttl': 600, 'type': 'A', 'value': '1.2.3.4'}
+                        for n in names
+                    ],
+                }
+            ]
+        }
+    )
+
+
+class TestAutoDNSExporter(TestCase):
+    def setUp(self):
+        self._tmp = TemporaryDirectory()
+        self.output_dir = join(self._tmp.name, 'out')
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def read(self, name):
+        with gzip.open(join(self.output_dir, f'{name}.jsonl.gz')) as fh:
+            return [json.loads(line) for line in fh]
+
+    def mock_api(self, mock, base):
+        mock.post(
+            f'{base}/zone/_search',
+            [
+                {
+                    'text': json.dumps(
+                        {
+                            'data': [
+                                {
+                                    'origin': 'one.tests',
+                                    'virtualNameServer': 'b.ns14.net',
+                                },
+                                {'origin': 'two.tests'},
+                            ]
+                        }
+                    )
+                },
+                {'text': json.dumps({'data': [{'origin': 'three.tests'}]})},
+            ],
+        )
+        mock.get(f'{base}/zone/one.tests/b.ns14.net', text=zone('www', ''))
+        mock.get(f'{base}/zone/two.tests/a.ns14.net', text=zone())
+        mock.get(f'{base}/zone/three.tests/a.ns14.net', text=zone('mail'))
+
+    def test_export(self):
+        client = AutoDNSClient(Session(), 'a.ns14.net')
+        client.ZONE_PAGE_SIZE = 2
+        exporter = AutoDNSExporter(client, self.output_dir, workers=1)
+
+        with requests_mock() as mock:
+            self.mock_api(mock, client.BASE_URL)
+            self.assertEqual(
+                {'one.tests': 2, 'two.tests': 0, 'three.tests': 1},
+                exporter.export(),
+            )
+            # zone listing is paged
+            self.assertEqual(
+                [
+                    {'view': {'offset': 0, 'limit': 2}},
+                    {'view': {'offset': 2, 'limit': 2}},
+                ],
+                [r.json() for r in mock.request_history if r.method == 'POST'],
+            )
+
+        self.assertEqual(
+            [
+                {'name': 'www', 'ttl': 600, 'type': 'A', 'value': '1.2.3.4'},
+                {'name': '', 'ttl': 600, 'type': 'A', 'value': '1.2.3.4'},
+            ],
+            self.read('one.tests'),
+        )
+        self.assertEqual([], self.read('two.tests'))
+        self.assertFalse(
+            exists(join(self.output_dir, 'one.tests.jsonl.gz.part'))
+        )
+
+        # already exported zones are skipped when resuming
+        with requests_mock() as mock:
+            mock.get(
+                f'{client.BASE_URL}/zone/four.tests/a.ns14.net',
+                text=zone('www'),
+            )
+            self.assertEqual(
+                {'one.tests': None, 'four.tests': 1},
+                exporter.export(['one.tests', 'four.tests']),
+            )
+            self.assertEqual(1, len(mock.request_history))
+
+    def test_failures(self):
+        client = AutoDNSClient(Session(), 'a.ns14.net')
+        exporter = AutoDNSExporter(client, self.output_dir, workers=1)
+        base = client.BASE_URL
+
+        # a failed zone is recorded and the others are still exported
+        with requests_mock() as mock:
+            mock.get(f'{base}/zone/one.tests/a.ns14.net', status_code=500)
+            mock.get(f'{base}/zone/two.tests/a.ns14.net', text=zone('www'))
+            with self.assertLogs('AutoDNSExporter', 'ERROR') as logs:
+                results = exporter.export(['one.tests', 'two.tests'])
+        self.assertIsInstance(results['one.tests'], HTTPError)
+        self.assertEqual(1, results['two.tests'])
+        self.assertIn('export: one.tests failed', logs.output[0])
+        self.assertFalse(exists(join(self.output_dir, 'one.tests.jsonl.gz')))
+
+        # and retried by the next run
+        with requests_mock() as mock:
+            mock.get(f'{base}/zone/one.tests/a.ns14.net', text=zone('www'))
+            self.assertEqual(
+                {'one.tests': 1, 'two.tests': None},
+                exporter.export(['one.tests', 'two.tests']),
+            )
+
+    def test_main(self):
+        argv = [
+            'octodns-autodns-export',
+            '--output-dir',
+            self.output_dir,
+            '--workers',
+            '2',
+        ]
+        env = {'AUTODNS_USERNAME': 'user', 'AUTODNS_PASSWORD': 'pass'}
+        with patch('sys.argv', argv), patch.dict('os.environ', env):
+            with patch.object(AutoDNSClient, 'ZONE_PAGE_SIZE', 2):
+                with requests_mock() as mock:
+                    self.mock_api(mock, AutoDNSClient.BASE_URL)
+                    main()
+                    self.assertEqual(
+                        '4',
+                        mock.request_history[0].headers[
+                            'X-Domainrobot-Context'
+                        ],
+                    )
+        self.assertEqual(
+            [{'name': 'mail', 'ttl': 600, 'type': 'A', 'value': '1.2.3.4'}],
+            self.read('three.tests'),
+        )
+
+        # failed zones make the export exit non-zero
+        argv.append('four.tests')
+        with patch('sys.argv', argv), patch.dict('os.environ', env):
+            with requests_mock() as mock, patch(
+                'sys.stderr', new_callable=StringIO
+            ) as stderr:
+                mock.get(ANY, status_code=500)
+                with self.assertRaises(SystemExit) as ctx:
+                    main()
+        self.assertEqual(1, ctx.exception.code)
+        self.assertEqual('Export failed for: four.tests\n', stderr.getvalue())
+
+    def test_main_credentials(self):
+        argv = ['octodns-autodns-export', '--output-dir', self.output_dir]
+        env = {'AUTODNS_USERNAME': 'user'}
+        with patch('sys.argv', argv), patch.dict(
+            'os.environ', env, clear=True
+        ), patch('sys.stderr', new_callable=StringIO) as stderr:
+            with self.assertRaises(SystemExit) as ctx:
+                main()
+        self.assertEqual(2, ctx.exception.code)
+        self.assertIn(
+            'AUTODNS_PASSWORD must be set in the environment', stderr.getvalue()
+        )
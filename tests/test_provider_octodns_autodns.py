@@ -2,19 +2,384 @@
 #
 #
 
-from os.path import dirname, join
+import json
+from concurrent.futures import Future
+from os import remove
+from os.path import dirname, exists, join
+from tempfile import TemporaryDirectory
+from threading import Event, Thread
+from time import sleep
 from unittest import TestCase
-from unittest.mock import MagicMock, Mock, call
+from unittest.mock import MagicMock, Mock, call, patch
 
-from requests import HTTPError
+from dns.exception import DNSException
+from requests import ConnectTimeout, HTTPError, Session
 from requests_mock import ANY
 from requests_mock import mock as requests_mock
 
+from octodns.processor.filter import (
+    NameRejectlistFilter,
+    TypeAllowlistFilter,
+    ValueRejectlistFilter,
+)
+from octodns.provider.plan import Plan
 from octodns.provider.yaml import YamlProvider
-from octodns.record import Record
+from octodns.record import Create, Record
 from octodns.zone import Zone
 
-from octodns_autodns import AutoDNSClientNotFound, AutoDNSProvider
+from octodns_autodns import (
+    AutoDNSApplyFailed,
+    AutoDNSClient,
+    AutoDNSClientException,
+    AutoDNSClientNotFound,
+    AutoDNSCodec,
+    AutoDNSConcurrencyLimiter,
+    AutoDNSJobFailed,
+    AutoDNSProvider,
+    AutoDNSValidationException,
+    _background_providers,
+    _wait_for_background_applies,
+)
+
+
+class TestAutoDNSCodec(TestCase):
+    def test_selection(self):
+        fake_orjson = Mock(dumps=Mock(), loads=Mock())
+        fake_msgspec_json = Mock(Encoder=Mock(), decode=Mock())
+
+        with patch.dict(
+            'sys.modules', {'orjson': fake_orjson, 'msgspec.json': None}
+        ):
+            codec = AutoDNSCodec()
+            self.assertEqual('orjson', codec.name)
+            self.assertIs(fake_orjson.dumps, codec.dumps)
+
+        with patch.dict(
+            'sys.modules', {'orjson': None, 'msgspec.json': fake_msgspec_json}
+        ):
+            codec = AutoDNSCodec()
+            self.assertEqual('msgspec', codec.name)
+            self.assertIs(
+                fake_msgspec_json.Encoder.return_value.encode, codec.dumps
+            )
+            self.assertIs(fake_msgspec_json.decode, codec.loads)
+
+        with patch.dict('sys.modules', {'orjson': None, 'msgspec.json': None}):
+            codec = AutoDNSCodec()
+            self.assertEqual('json', codec.name)
+            self.assertEqual(b'{"a":[1,"b"]}', codec.dumps({'a': [1, 'b']}))
+            self.assertEqual({'a': [1]}, codec.loads(b'{"a": [1]}'))
+
+            with self.assertRaises(AutoDNSClientException) as ctx:
+                AutoDNSCodec('orjson')
+            self.assertEqual(
+                'Unavailable JSON codec: orjson', str(ctx.exception)
+            )
+
+        with self.assertRaises(AutoDNSClientException):
+            AutoDNSCodec('yaml')
+
+    def test_record_values(self):
+        # octoDNS values are str subclasses, every codec has to encode them
+        zone = Zone('unit.tests.', [])
+        YamlProvider('test', join(dirname(__file__), 'config')).populate(zone)
+        provider = AutoDNSProvider('test', 'username', 'password', 4)
+        params = [
+            p
+            for record in sorted(zone.records)
+            for p in getattr(provider, f'_params_for_{record._type}')(record)
+        ]
+        self.assertEqual(
+            sorted(AutoDNSProvider.SUPPORTS),
+            sorted({p['type'] for p in params}),
+        )
+        expected = json.loads(json.dumps(params))
+        for name in AutoDNSCodec.PREFERENCE:
+            try:
+                codec = AutoDNSCodec(name)
+            except AutoDNSClientException:
+                continue
+            with self.subTest(codec=name):
+                self.assertEqual(expected, codec.loads(codec.dumps(params)))
+
+    def test_bodies(self):
+        codec = AutoDNSCodec('json')
+        client = AutoDNSClient(Session(), 'a.ns14.net', codec=codec)
+        self.assertIs(codec, client.codec)
+        self.assertIs(codec, client.for_context('9').codec)
+        url = f'{client.BASE_URL}/zone/unit.tests./_stream'
+        with requests_mock() as mock:
+            mock.post(url, text='{"status": {"type": "SUCCESS"}}')
+
+            ret = client.zone_update_records(
+                'unit.tests.', records_add=[{'name': 'a'}], records_remove=[]
+            )
+            self.assertEqual({'status': {'type': 'SUCCESS'}}, ret)
+            request = mock.request_history[0]
+            self.assertEqual(b'{"adds":[{"name":"a"}],"rems":[]}', request.body)
+            self.assertEqual(
+                'application/json', request.headers['Content-Type']
+            )
+
+            # pre-serialized bodies are sent as-is
+            client._do('POST', '/zone/unit.tests./_stream', data=b'{"adds":[]}')
+            self.assertEqual(b'{"adds":[]}', mock.request_history[1].body)
+
+
+class TestAutoDNSClient(TestCase):
+    def test_thread_sessions(self):
+        template = Session()
+        template.auth = ('username', 'password')
+        client = AutoDNSClient(template, 'a.ns14.net')
+        other = client.for_context('9')
+
+        sessions = []
+
+        def collect():
+            sessions.append(client._sessions.get())
+            sessions.append(other._sessions.get())
+
+        thread = Thread(target=collect)
+        thread.start()
+        thread.join()
+        collect()
+
+        # one session per thread, shared by all contexts
+        self.assertIs(sessions[0], sessions[1])
+        self.assertIs(sessions[2], sessions[3])
+        self.assertIsNot(sessions[0], sessions[2])
+        for session in sessions:
+            self.assertIsNot(template, session)
+            self.assertEqual(('username', 'password'), session.auth)
+            # with the connection pools of the template
+            self.assertIs(template.adapters, session.adapters)
+
+    def test_timeout(self):
+        client = AutoDNSClient(Session(), 'a.ns14.net', timeout=7)
+        self.assertEqual(7, client.for_context('9').timeout)
+        with patch.object(Session, 'request') as request:
+            request.return_value.status_code = 200
+            client._do('GET', '/zone/unit.tests./a.ns14.net')
+        self.assertEqual(7, request.call_args.kwargs['timeout'])
+
+        provider = AutoDNSProvider('test', 'username', 'password', 4)
+        self.assertEqual(60, provider.client.timeout)
+        # apply workers follow the limiter's maximum, which decides how many
+        # requests are actually in flight
+        self.assertEqual(32, provider.max_workers)
+        self.assertEqual(32, provider.client._limiter.maximum)
+        provider = AutoDNSProvider(
+            'test', 'username', 'password', 4, max_concurrency=8
+        )
+        self.assertEqual(8, provider.max_workers)
+        # unless pinned, e.g. to apply sequentially
+        provider = AutoDNSProvider(
+            'test', 'username', 'password', 4, max_workers=1
+        )
+        self.assertEqual(1, provider.max_workers)
+        self.assertEqual(32, provider.client._limiter.maximum)
+
+    @patch('octodns_autodns.sleep')
+    def test_throttle_retries(self, sleep):
+        client = AutoDNSClient(Session(), 'a.ns14.net')
+        url = f'{client.BASE_URL}/zone/unit.tests./a.ns14.net'
+        throttled = {'status_code': 429, 'text': 'Too Many Requests'}
+
+        # throttled requests are retried with backoff, honoring Retry-After
+        with requests_mock() as mock:
+            mock.get(
+                url,
+                [
+                    throttled,
+                    dict(throttled, headers={'Retry-After': '3'}),
+                    dict(throttled, headers={'Retry-After': 'soon'}),
+                    {'text': '{"data": []}'},
+                ],
+            )
+            self.assertEqual({'data': []}, client.zone_get('unit.tests.'))
+            self.assertEqual(4, len(mock.request_history))
+        self.assertEqual([call(1), call(3), call(4)], sleep.call_args_list)
+
+        # until the retries are used up
+        sleep.reset_mock()
+        with requests_mock() as mock:
+            mock.get(url, **throttled)
+            with self.assertRaises(HTTPError) as ctx:
+                client.zone_get('unit.tests.')
+            self.assertEqual(429, ctx.exception.response.status_code)
+            self.assertEqual(6, len(mock.request_history))
+        self.assertEqual(
+            [call(1), call(2), call(4), call(8), call(16)], sleep.call_args_list
+        )
+
+    def test_single_flight(self):
+        client = AutoDNSClient(Session(), 'a.ns14.net')
+        started = Event()
+        release = Event()
+        calls = []
+
+        def do_json(method, path):
+            calls.append(path)
+            started.set()
+            release.wait(1)
+            if len(calls) > 1:
+                raise HTTPError('boom')
+            return {'data': []}
+
+        client._do_json = do_json
+        results = []
+
+        def get():
+            try:
+                results.append(client.zone_get('unit.tests.'))
+            except HTTPError as e:
+                results.append(e)
+
+        threads = [Thread(target=get) for _ in range(3)]
+        threads[0].start()
+        started.wait(1)
+        for thread in threads[1:]:
+            thread.start()
+        # give the followers time to join the in-flight request
+        sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join(1)
+
+        self.assertEqual(['/zone/unit.tests./a.ns14.net'], calls)
+        self.assertEqual([{'data': []}] * 3, results)
+        self.assertIs(results[0], results[1])
+        self.assertEqual({}, client._flights)
+
+        # failures are shared the same way and not cached
+        results = []
+        get()
+        self.assertIsInstance(results[0], HTTPError)
+        self.assertEqual(2, len(calls))
+
+
+class TestAutoDNSClientJobs(TestCase):
+    def test_job_id(self):
+        self.assertIsNone(AutoDNSClient.job_id({}))
+        self.assertIsNone(AutoDNSClient.job_id({'status': {'type': 'SUCCESS'}}))
+        self.assertEqual(
+            42,
+            AutoDNSClient.job_id(
+                {'status': {'type': 'NOTIFY'}, 'data': [{'id': 42}]}
+            ),
+        )
+
+    @patch.object(AutoDNSClient, 'JOB_POLL_INTERVAL', 0)
+    def test_job_wait(self):
+        client = AutoDNSClient(Session(), 'a.ns14.net')
+        url = f'{client.BASE_URL}/job/42'
+
+        def job(status):
+            return {
+                'text': json.dumps({'data': [{'id': 42, 'status': status}]})
+            }
+
+        with requests_mock() as mock:
+            mock.get(url, [job('PENDING'), job('RUNNING'), job('SUCCESS')])
+            self.assertEqual(
+                {'id': 42, 'status': 'SUCCESS'}, client.job_wait(42)
+            )
+            self.assertEqual(3, len(mock.request_history))
+
+        with requests_mock() as mock:
+            mock.get(url, [job('RUNNING'), job('FAILED')])
+            with self.assertRaises(AutoDNSJobFailed) as ctx:
+                client.job_wait(42)
+            self.assertEqual('FAILED', ctx.exception.status)
+            self.assertEqual(
+                'Job 42 finished with status FAILED', str(ctx.exception)
+            )
+
+        with requests_mock() as mock:
+            mock.get(url, [job('RUNNING')])
+            with patch.object(AutoDNSClient, 'JOB_TIMEOUT', 0):
+                with self.assertRaises(AutoDNSJobFailed) as ctx:
+                    client.job_wait(42)
+            self.assertEqual('TIMEOUT', ctx.exception.status)
+
+
+class TestAutoDNSConcurrencyLimiter(TestCase):
+    def test_aimd(self):
+        limiter = AutoDNSConcurrencyLimiter(initial=2, maximum=4)
+        self.assertEqual(2, limiter.limit)
+
+        # flat latencies grow the limit additively up to the maximum
+        for _ in range(20):
+            limiter.acquire()
+            self.assertEqual(1, limiter.in_flight)
+            limiter.release(0.1)
+        self.assertEqual(0, limiter.in_flight)
+        self.assertEqual(4, limiter.limit)
+
+        # a latency spike halves it
+        limiter.acquire()
+        limiter.release(1.0)
+        self.assertEqual(2, limiter.limit)
+
+        # so does throttling and failed requests, never below the minimum
+        limiter.acquire()
+        limiter.release(0.1, throttled=True)
+        self.assertEqual(1, limiter.limit)
+        limiter.acquire()
+        limiter.release()
+        self.assertEqual(1, limiter.limit)
+
+    def test_baseline(self):
+        limiter = AutoDNSConcurrencyLimiter(initial=4, maximum=8, window=5)
+
+        def release(latency, kind=None):
+            limiter.acquire()
+            limiter.release(latency, kind=kind)
+
+        # a lasting slowdown becomes the new baseline once the fast samples
+        # aged out of the window
+        release(0.02)
+        for _ in range(5):
+            release(0.1)
+        self.assertEqual(1, limiter.limit)
+        for _ in range(10):
+            release(0.1)
+        self.assertEqual(4, limiter.limit)
+
+        # every kind of request has a baseline of its own
+        release(1.0, kind='GET zone')
+        self.assertEqual(4, limiter.limit)
+        release(0.1, kind='POST zone _stream')
+        self.assertEqual(5, limiter.limit)
+        release(1.0, kind='POST zone _stream')
+        self.assertEqual(2, limiter.limit)
+
+    def test_kinds(self):
+        client = AutoDNSClient(Session(), 'a.ns14.net')
+        client._limiter = Mock(wraps=client._limiter)
+        with requests_mock() as mock:
+            mock.get(ANY, content=b'x' * 3 * AutoDNSClient.LATENCY_UNIT)
+            mock.post(ANY, text='{}')
+            client._do('GET', '/zone/unit.tests./a.ns14.net')
+            client._do('POST', '/zone/unit.tests./_stream')
+            client._do('POST', '/zone/_search')
+            client._do('GET', '/job/42')
+        self.assertEqual(
+            ['GET zone', 'POST zone _stream', 'POST zone _search', 'GET job'],
+            [c.args[2] for c in client._limiter.release.call_args_list],
+        )
+
+    def test_blocks_at_limit(self):
+        limiter = AutoDNSConcurrencyLimiter(initial=1)
+        limiter.acquire()
+        waiter = Thread(target=limiter.acquire)
+        waiter.start()
+        waiter.join(0.05)
+        self.assertTrue(waiter.is_alive())
+        limiter.release(0.1)
+        waiter.join(1)
+        self.assertFalse(waiter.is_alive())
+        self.assertEqual(1, limiter.in_flight)
 
 
 class TestAutoDNSProvider(TestCase):
@@ -83,6 +448,30 @@ class TestAutoDNSProvider(TestCase):
                 zone = Zone("unit.tests.", [])
                 provider.populate(zone)
 
+        # Throttling and timeouts shrink the concurrency limit
+        provider = AutoDNSProvider(
+            "test", "username", "password", 4, max_concurrency=8
+        )
+        self.assertEqual(8, provider.client._limiter.maximum)
+        self.assertEqual(4, provider.client.concurrency_limit)
+        with requests_mock() as mock, patch.object(
+            AutoDNSClient, 'THROTTLE_RETRIES', 0
+        ):
+            mock.get(ANY, status_code=429, text="Too Many Requests")
+
+            with self.assertRaises(HTTPError) as ctx:
+                zone = Zone("unit.tests.", [])
+                provider.populate(zone)
+            self.assertEqual(429, ctx.exception.response.status_code)
+        self.assertEqual(2, provider.client.concurrency_limit)
+        with requests_mock() as mock:
+            mock.get(ANY, exc=ConnectTimeout)
+
+            with self.assertRaises(ConnectTimeout):
+                zone = Zone("unit.tests.", [])
+                provider.populate(zone)
+        self.assertEqual(1, provider.client.concurrency_limit)
+
         # No diffs == no changes
         with requests_mock() as mock:
             base = provider.client.BASE_URL
@@ -95,11 +484,676 @@ class TestAutoDNSProvider(TestCase):
             changes = self.expected.changes(zone, provider)
             self.assertEqual(0, len(changes))
 
+    def test_contexts(self):
+        provider = AutoDNSProvider(
+            "test",
+            "username",
+            "password",
+            4,
+            zone_contexts={'other.tests': 9, 'unit.tests.': 4},
+        )
+        base = provider.client.BASE_URL
+        with open('tests/fixtures/unit.tests.zone.json') as fh:
+            fixture = fh.read()
+
+        with requests_mock() as mock:
+            mock.get(f'{base}/zone/unit.tests./a.ns14.net', text=fixture)
+            mock.get(f'{base}/zone/other.tests./a.ns14.net', text=fixture)
+            mock.get(f'{base}/zone/default.tests./a.ns14.net', text=fixture)
+
+            for name in ('unit.tests.', 'other.tests.', 'default.tests.'):
+                provider.populate(Zone(name, []))
+
+            self.assertEqual(
+                ['4', '9', '4'],
+                [
+                    r.headers['X-Domainrobot-Context']
+                    for r in mock.request_history
+                ],
+            )
+
+        # one client per context, all sharing a single session and limiter
+        self.assertEqual(['4', '9'], sorted(provider._clients))
+        other = provider._clients['9']
+        self.assertIs(provider.client._session, other._session)
+        self.assertIs(provider.client._limiter, other._limiter)
+
+        # threads asking for a new context concurrently share one client
+        for_context = provider.client.for_context
+
+        def slow_for_context(context):
+            sleep(0.01)
+            return for_context(context)
+
+        clients = []
+        with patch.object(
+            provider.client, 'for_context', side_effect=slow_for_context
+        ):
+            provider.zone_contexts['third.tests.'] = '7'
+            threads = [
+                Thread(
+                    target=lambda: clients.append(
+                        provider._client_for('third.tests.')
+                    )
+                )
+                for _ in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(1)
+        self.assertEqual(4, len(clients))
+        self.assertEqual(1, len({id(c) for c in clients}))
+
+        # a client without a context leaves it to the session
+        client = AutoDNSClient(Session(), 'a.ns14.net')
+        with requests_mock() as mock:
+            mock.get(f'{base}/zone/unit.tests./a.ns14.net', text=fixture)
+            client.zone_get('unit.tests.')
+            self.assertNotIn(
+                'X-Domainrobot-Context', mock.request_history[0].headers
+            )
+
+    def test_zone_serial(self):
+        client = AutoDNSClient(Session(), 'a.ns14.net')
+        with patch('octodns_autodns.gethostbyname', return_value='192.0.2.1'):
+            with patch(
+                'octodns_autodns.udp',
+                return_value=Mock(answer=[[Mock(serial=42)]]),
+            ) as udp:
+                self.assertEqual(42, client.zone_serial('unit.tests.'))
+            self.assertEqual('192.0.2.1', udp.call_args[0][1])
+
+            with patch('octodns_autodns.udp', side_effect=DNSException):
+                self.assertIsNone(client.zone_serial('unit.tests.'))
+
+        with patch('octodns_autodns.gethostbyname', side_effect=OSError):
+            self.assertIsNone(client.zone_serial('unit.tests.'))
+
+    def test_state(self):
+        remote = {
+            'data': [
+                {
+                    'soa': {'ttl': 86400},
+                    'resourceRecords': [
+                        {
+                            'name': 'one',
+                            'ttl': 600,
+                            'type': 'A',
+                            'value': '1.2.3.4',
+                        }
+                    ],
+                }
+            ]
+        }
+        wanted = Zone('unit.tests.', [])
+        wanted.add_record(
+            Record.new(
+                wanted, 'one', {'ttl': 600, 'type': 'A', 'value': '5.6.7.8'}
+            )
+        )
+
+        def provider_for(state_file, serial):
+            provider = AutoDNSProvider(
+                "test", "username", "password", 4, state_file=state_file
+            )
+            provider.client.zone_get = MagicMock(return_value=remote)
+            provider.client.zone_serial = MagicMock(return_value=serial)
+            provider.client._do = Mock(return_value=Mock(content=b'{}'))
+            return provider
+
+        with TemporaryDirectory() as tmpdir:
+            state_file = join(tmpdir, 'state.json')
+
+            # nothing recorded yet, plan and apply as usual
+            provider = provider_for(state_file, 1)
+            plan = provider.plan(wanted)
+            self.assertEqual(1, len(plan.changes))
+            provider.apply(plan)
+            with open(state_file) as fh:
+                state = json.load(fh)
+            self.assertEqual(1, state['unit.tests.']['serial'])
+
+            # a new run with the same desired state and serial skips the zone
+            provider = provider_for(state_file, 1)
+            self.assertIsNone(provider.plan(wanted))
+            provider.client.zone_get.assert_not_called()
+
+            # a changed serial requires a full plan
+            provider = provider_for(state_file, 2)
+            self.assertEqual(1, len(provider.plan(wanted).changes))
+            provider.client.zone_get.assert_called_once()
+
+            # as does a changed desired state, a plan without changes is
+            # recorded as well
+            current = Zone('unit.tests.', [])
+            current.add_record(
+                Record.new(
+                    current,
+                    'one',
+                    {'ttl': 600, 'type': 'A', 'value': '1.2.3.4'},
+                )
+            )
+            provider = provider_for(state_file, 3)
+            self.assertIsNone(provider.plan(current))
+            provider.client.zone_get.assert_called_once()
+            with open(state_file) as fh:
+                state = json.load(fh)
+            self.assertEqual(3, state['unit.tests.']['serial'])
+
+            # nothing is recorded when the serial can't be determined
+            provider = provider_for(state_file, None)
+            provider.apply(provider.plan(wanted))
+            with open(state_file) as fh:
+                self.assertEqual(state, json.load(fh))
+
+            # processors count with their configuration, a widened filter
+            # brings remote records under management and requires a full plan
+            provider = provider_for(state_file, 4)
+            managed = TypeAllowlistFilter('managed', ['A'])
+            self.assertIsNone(provider.plan(current, [managed]))
+            provider = provider_for(state_file, 4)
+            managed = TypeAllowlistFilter('managed', ['A'])
+            self.assertIsNone(provider.plan(current, [managed]))
+            provider.client.zone_get.assert_not_called()
+            provider = provider_for(state_file, 4)
+            managed = TypeAllowlistFilter('managed', ['A', 'TXT'])
+            self.assertIsNone(provider.plan(current, [managed]))
+            provider.client.zone_get.assert_called_once()
+
+    def test_validation(self):
+        provider = AutoDNSProvider("test", "username", "password", 4)
+        provider.client._do = Mock()
+
+        zone = Zone('unit.tests.', [])
+        long_name = '.'.join(['x' * 60] * 4)
+        for name, data in (
+            (
+                '',
+                {
+                    'type': 'CAA',
+                    'ttl': 600,
+                    'values': [
+                        {'flags': 0, 'tag': 'issue', 'value': 'ca.tests'},
+                        {'flags': 0, 'tag': 'is-sue', 'value': 'a; b=c'},
+                        {'flags': 0, 'tag': 'issue', 'value': 'a"b'},
+                        {'flags': 256, 'tag': 'issue', 'value': 'ca.tests'},
+                    ],
+                },
+            ),
+            (
+                '_srv._tcp',
+                {
+                    'type': 'SRV',
+                    'ttl': 600,
+                    'value': {
+                        'priority': 70000,
+                        'weight': 10,
+                        'port': 8443,
+                        'target': 'www.unit.tests',
+                    },
+                },
+            ),
+            ('txt', {'type': 'TXT', 'ttl': 600, 'value': 'x' * 4097}),
+            ('cname', {'type': 'CNAME', 'ttl': 0, 'value': 'www.unit.tests'}),
+            ('a' * 64, {'type': 'A', 'ttl': 600, 'value': '1.2.3.4'}),
+            # 254 characters with the zone, just short enough without it
+            (long_name, {'type': 'A', 'ttl': 600, 'value': '1.2.3.4'}),
+            # exactly 253 characters with the zone
+            (long_name[:-1], {'type': 'A', 'ttl': 600, 'value': '1.2.3.4'}),
+            (
+                'mx',
+                {
+                    'type': 'MX',
+                    'ttl': 600,
+                    'value': {'exchange': 'mx.', 'preference': 1},
+                },
+            ),
+        ):
+            zone.add_record(
+                Record.new(zone, name, data, lenient=True), lenient=True
+            )
+        plan = Plan(None, zone, [Create(r) for r in zone.records], exists=True)
+
+        with self.assertRaises(AutoDNSValidationException) as ctx:
+            provider.apply(plan)
+        self.assertEqual(
+            [
+                'A "{}": name too long'.format('a' * 64),
+                f'A "{long_name}": name too long',
+                'CAA "": CAA flags 256 out of range',
+                'CAA "": CAA value a"b contains quotes',
+                'CAA "": invalid CAA tag is-sue',
+                'CNAME "cname": invalid ttl 0',
+                'CNAME "cname": target www.unit.tests has no trailing dot',
+                'SRV "_srv._tcp": SRV priority 70000 out of range',
+                'SRV "_srv._tcp": SRV target www.unit.tests has no trailing dot',
+                'TXT "txt": TXT value longer than 4096 characters',
+            ],
+            sorted(ctx.exception.problems),
+        )
+        self.assertTrue(
+            str(ctx.exception).startswith('Invalid records for unit.tests.:')
+        )
+        # nothing was sent
+        provider.client._do.assert_not_called()
+
+    def test_caa_values(self):
+        provider = AutoDNSProvider("test", "username", "password", 4)
+        value = '0 issue "ca.tests; account=230123 validationmethods=dns-01"'
+        provider.client.zone_get = MagicMock(
+            return_value={
+                'data': [
+                    {
+                        'soa': {'ttl': 86400},
+                        'resourceRecords': [
+                            {
+                                'name': '',
+                                'ttl': 600,
+                                'type': 'CAA',
+                                'value': value,
+                            }
+                        ],
+                    }
+                ]
+            }
+        )
+
+        # values with spaces, as RFC 8659 parameters have, round-trip
+        zone = Zone('unit.tests.', [])
+        provider.populate(zone)
+        record = next(iter(zone.records))
+        self.assertEqual(
+            'ca.tests; account=230123 validationmethods=dns-01',
+            record.values[0].value,
+        )
+        params = list(provider._params_for_CAA(record))
+        self.assertEqual(value, params[0]['value'])
+        self.assertEqual(
+            [], list(provider._validate_params('unit.tests.', params[0]))
+        )
+
+    def test_checkpoint(self):
+        remote = {
+            'data': [
+                {
+                    'soa': {'ttl': 86400},
+                    'resourceRecords': [
+                        {
+                            'name': 'one',
+                            'ttl': 600,
+                            'type': 'A',
+                            'value': '1.2.3.4',
+                        },
+                        {
+                            'name': 'two',
+                            'ttl': 600,
+                            'type': 'A',
+                            'value': '1.2.3.4',
+                        },
+                    ],
+                }
+            ]
+        }
+        wanted = Zone('unit.tests.', [])
+        wanted.add_record(
+            Record.new(
+                wanted, 'one', {'ttl': 600, 'type': 'A', 'value': '5.6.7.8'}
+            )
+        )
+        ok = Mock(content=b'{}')
+
+        def provider_for(checkpoint_dir, *responses):
+            provider = AutoDNSProvider(
+                "test", "username", "password", 4, checkpoint_dir=checkpoint_dir
+            )
+            provider.client.zone_get = MagicMock(return_value=remote)
+            provider.client._do = Mock(side_effect=responses)
+            return provider
+
+        def bodies(provider):
+            return [c[0][3] for c in provider.client._do.call_args_list]
+
+        with TemporaryDirectory() as tmpdir:
+            checkpoint_dir = join(tmpdir, 'checkpoints')
+            checkpoint_file = join(checkpoint_dir, 'unit.tests.json')
+
+            # the apply dies after the first batch
+            provider = provider_for(checkpoint_dir, ok, ConnectTimeout())
+            plan = provider.plan(wanted)
+            with self.assertRaises(ConnectTimeout):
+                provider.apply(plan)
+            with open(checkpoint_file) as fh:
+                lines = fh.read().splitlines()
+            self.assertEqual(2, len(lines))
+            self.assertEqual(2, len(json.loads(lines[0])['payloads']))
+            self.assertEqual('0', lines[1])
+
+            # re-applying the same plan skips the committed batch
+            provider.client._do = Mock(side_effect=[ConnectTimeout()])
+            with self.assertRaises(ConnectTimeout):
+                provider.apply(plan)
+            self.assertEqual(
+                [
+                    {
+                        'adds': [
+                            {
+                                'name': 'one',
+                                'ttl': 600,
+                                'type': 'A',
+                                'value': '5.6.7.8',
+                            }
+                        ],
+                        'rems': [
+                            {
+                                'name': 'one',
+                                'ttl': 600,
+                                'type': 'A',
+                                'value': '1.2.3.4',
+                            }
+                        ],
+                    }
+                ],
+                bodies(provider),
+            )
+
+            # a new run resumes without populating, a torn last line is
+            # ignored
+            with open(checkpoint_file, 'a') as fh:
+                fh.write('1')
+            provider = provider_for(checkpoint_dir, ok)
+            plan = provider.plan(wanted)
+            provider.client.zone_get.assert_not_called()
+            self.assertEqual(
+                {'autodns_resume': {'committed': 1, 'total': 2}}, plan.meta
+            )
+            # and dropped before the next index is committed
+            checkpoint = provider._resumes['unit.tests.']
+            checkpoint.commit(1)
+            checkpoint.close()
+            with open(checkpoint_file) as fh:
+                self.assertEqual(lines + ['1'], fh.read().splitlines())
+
+            # a torn or unreadable header is no checkpoint at all
+            for content in (lines[0][:10], 'garbage\n0\n'):
+                with open(checkpoint_file, 'w') as fh:
+                    fh.write(content)
+                provider = provider_for(checkpoint_dir, ok, ok)
+                plan = provider.plan(wanted)
+                provider.client.zone_get.assert_called_once()
+                self.assertEqual(2, len(plan.changes))
+
+            with open(checkpoint_file, 'w') as fh:
+                fh.write(lines[0])
+                fh.write('\n0\nx\n1')
+            provider = provider_for(checkpoint_dir, ok)
+            plan = provider.plan(wanted)
+            self.assertEqual(
+                {'autodns_resume': {'committed': 1, 'total': 2}}, plan.meta
+            )
+            self.assertEqual(0, provider.apply(plan))
+            self.assertEqual(1, len(bodies(provider)))
+            self.assertEqual('5.6.7.8', bodies(provider)[0]['adds'][0]['value'])
+            self.assertFalse(exists(checkpoint_file))
+
+            # a checkpoint of another desired state is discarded
+            with open(checkpoint_file, 'w') as fh:
+                fh.write(lines[0])
+                fh.write('\n0\n')
+            other = Zone('unit.tests.', [])
+            provider = provider_for(checkpoint_dir, ok, ok)
+            plan = provider.plan(other)
+            provider.client.zone_get.assert_called_once()
+            self.assertEqual(2, len(plan.changes))
+            self.assertFalse(exists(checkpoint_file))
+            provider.apply(plan)
+            self.assertEqual(2, len(bodies(provider)))
+            self.assertFalse(exists(checkpoint_file))
+
+            # throttling and server errors keep the checkpoint to resume from
+            for status in (429, 503):
+                error = HTTPError(response=Mock(status_code=status))
+                provider = provider_for(checkpoint_dir, ok, error)
+                with self.assertRaises(HTTPError):
+                    provider.apply(provider.plan(wanted))
+                self.assertTrue(exists(checkpoint_file))
+                remove(checkpoint_file)
+
+            # permanent rejections discard it, the next run reads the zone
+            # again instead of replaying the rejected payload
+            for error in (
+                HTTPError(response=Mock(status_code=400)),
+                HTTPError('no response'),
+                AutoDNSJobFailed(7, 'FAILED'),
+            ):
+                provider = provider_for(checkpoint_dir, ok, error)
+                if isinstance(error, AutoDNSJobFailed):
+                    provider.client.job_id = Mock(side_effect=[None, 7])
+                    provider.client.job_wait = Mock(side_effect=error)
+                    provider.client._do = Mock(side_effect=[ok, ok])
+                plan = provider.plan(wanted)
+                with self.assertRaises(type(error)), self.assertLogs(
+                    provider.log, 'WARNING'
+                ) as logs:
+                    provider.apply(plan)
+                self.assertIn('discarding checkpoint', logs.output[0])
+                self.assertFalse(exists(checkpoint_file))
+
+            # nothing to resume or apply when remote already matches
+            current = Zone('unit.tests.', [])
+            for name in ('one', 'two'):
+                current.add_record(
+                    Record.new(
+                        current,
+                        name,
+                        {'ttl': 600, 'type': 'A', 'value': '1.2.3.4'},
+                    )
+                )
+            provider = provider_for(checkpoint_dir)
+            self.assertIsNone(provider.plan(current))
+
+    def test_background_apply(self):
+        provider = AutoDNSProvider(
+            "test", "username", "password", 4, background_apply=True
+        )
+        provider.client.zone_get = MagicMock(
+            return_value={
+                'data': [{'soa': {'ttl': 86400}, 'resourceRecords': []}]
+            }
+        )
+        wanted = Zone('unit.tests.', [])
+        wanted.add_record(
+            Record.new(
+                wanted, 'one', {'ttl': 600, 'type': 'A', 'value': '5.6.7.8'}
+            )
+        )
+        base = provider.client.BASE_URL
+        notify = json.dumps({'status': {'type': 'NOTIFY'}, 'data': [{'id': 7}]})
+
+        for status in ('SUCCESS', 'FAILED'):
+            release = Event()
+            with requests_mock() as mock:
+                mock.post(f'{base}/zone/unit.tests./_stream', text=notify)
+                mock.get(
+                    f'{base}/job/7',
+                    text=json.dumps({'data': [{'id': 7, 'status': status}]}),
+                )
+                apply_zone = provider._apply_zone
+
+                def blocked_apply_zone(plan):
+                    release.wait(1)
+                    return apply_zone(plan)
+
+                with patch.object(
+                    provider, '_apply_zone', side_effect=blocked_apply_zone
+                ):
+                    # apply returns while the zone is still being applied
+                    self.assertEqual(1, provider.apply(provider.plan(wanted)))
+                    self.assertEqual(['unit.tests.'], list(provider._applies))
+                    self.assertIn(provider, _background_providers)
+                    release.set()
+                    with self.assertLogs(provider.log) as logs:
+                        if status == 'SUCCESS':
+                            self.assertEqual(
+                                ['unit.tests.'], provider.wait_for_applies()
+                            )
+                        else:
+                            with self.assertRaises(AutoDNSApplyFailed) as ctx:
+                                provider.wait_for_applies()
+
+            self.assertEqual({}, provider._applies)
+            if status == 'SUCCESS':
+                self.assertIn('unit.tests. applied', logs.output[0])
+        self.assertIn('unit.tests. failed', logs.output[0])
+        failure = ctx.exception.failures['unit.tests.']
+        self.assertIsInstance(failure, AutoDNSJobFailed)
+        self.assertEqual(
+            'Background apply failed for:\n'
+            '  unit.tests.: Job 7 finished with status FAILED',
+            str(ctx.exception),
+        )
+
+        # waiting releases the provider
+        self.assertNotIn(provider, _background_providers)
+
+        # at exit all providers are waited for, failures of any of them set
+        # the exit status once
+        def failed_provider(name):
+            provider = AutoDNSProvider(name, "username", "password", 4)
+            failed = Future()
+            failed.set_exception(failure)
+            provider._applies[f'{name}.tests.'] = failed
+            return provider
+
+        providers = [failed_provider('one'), failed_provider('two')]
+        with patch('octodns_autodns._exit') as _exit, patch(
+            'octodns_autodns.shutdown_logging'
+        ):
+            _wait_for_background_applies()
+            _exit.assert_not_called()
+
+            _background_providers.update(providers)
+            with self.assertLogs(level='ERROR') as logs:
+                _wait_for_background_applies()
+            _exit.assert_called_once_with(1)
+        self.assertEqual(2, len(logs.output))
+        self.assertIn('one.tests. failed', logs.output[0])
+        self.assertIn('two.tests. failed', logs.output[1])
+        self.assertEqual(set(), _background_providers)
+
+    def test_filters(self):
+        provider = AutoDNSProvider(
+            "test",
+            "username",
+            "password",
+            4,
+            include_names=['/^example/', 'mta'],
+            include_types=['A', 'MX'],
+        )
+        base = provider.client.BASE_URL
+        with open('tests/fixtures/unit.tests.zone.json') as fh:
+            fixture = fh.read()
+
+        with requests_mock() as mock:
+            mock.get(f'{base}/zone/unit.tests./a.ns14.net', text=fixture)
+
+            zone = Zone('unit.tests.', [])
+            provider.populate(zone)
+            self.assertEqual(
+                [('example', 'A'), ('example2', 'A'), ('mta', 'MX')],
+                sorted((r.name, r._type) for r in zone.records),
+            )
+
+            # records outside the filters are neither created nor deleted
+            self.assertIsNone(provider.plan(self.expected))
+
+        # the filters are part of the fingerprint, recorded state doesn't
+        # hide records they start to manage
+        fingerprint = provider._fingerprint(self.expected, [])
+        for include_names, include_types in (
+            (['mta', '/^example/'], ['MX', 'A']),
+            (['/^example/', 'mta'], ['A', 'MX']),
+        ):
+            other = AutoDNSProvider(
+                "test",
+                "username",
+                "password",
+                4,
+                include_names=include_names,
+                include_types=include_types,
+            )
+            self.assertEqual(fingerprint, other._fingerprint(self.expected, []))
+        for include_names, include_types in (
+            (['/^example/'], ['A', 'MX']),
+            (['/^example/', 'mta'], ['A', 'MX', 'TXT']),
+            (None, None),
+        ):
+            other = AutoDNSProvider(
+                "test",
+                "username",
+                "password",
+                4,
+                include_names=include_names,
+                include_types=include_types,
+            )
+            self.assertNotEqual(
+                fingerprint, other._fingerprint(self.expected, [])
+            )
+
+        # processor configuration is normalised, order doesn't matter
+        self.assertEqual(
+            provider._fingerprint(
+                self.expected, [NameRejectlistFilter('n', ['a', '/^b/', 'c'])]
+            ),
+            provider._fingerprint(
+                self.expected, [NameRejectlistFilter('n', ['c', '/^b/', 'a'])]
+            ),
+        )
+        self.assertNotEqual(
+            provider._fingerprint(
+                self.expected, [NameRejectlistFilter('n', ['/^b/'])]
+            ),
+            provider._fingerprint(
+                self.expected, [NameRejectlistFilter('n', ['/^c/'])]
+            ),
+        )
+        value = MagicMock(pattern=None)
+        value.__str__.return_value = 'other'
+        self.assertEqual('other', provider._fingerprint_default(value))
+
+        # filter processors that include the target are pushed down
+        provider = AutoDNSProvider("test", "username", "password", 4)
+        processors = [
+            TypeAllowlistFilter('cnames', ['CNAME']),
+            NameRejectlistFilter('no-unit2', ['unit2.test']),
+            # not pushed down, target zone filtering disabled or not by
+            # name or type
+            NameRejectlistFilter('source-only', ['www'], include_target=False),
+            ValueRejectlistFilter('values', ['never']),
+        ]
+        desired = self.expected.copy()
+        for processor in processors[:2]:
+            desired = processor.process_source_zone(desired, [])
+
+        with requests_mock() as mock:
+            mock.get(f'{base}/zone/unit.tests./a.ns14.net', text=fixture)
+
+            with patch.object(
+                provider, '_data_for_SINGLE', wraps=provider._data_for_SINGLE
+            ) as single, patch.object(
+                provider, '_data_for_MULTI', wraps=provider._data_for_MULTI
+            ) as multi:
+                self.assertIsNone(provider.plan(desired, processors))
+            self.assertEqual(1, single.call_count)
+            self.assertEqual('CNAME', single.call_args[0][0])
+            multi.assert_not_called()
+        self.assertEqual({}, provider._populate_filters)
+
     def test_apply(self):
         provider = AutoDNSProvider("test", "username", "password", 4)
 
         resp = Mock()
-        resp.json = Mock()
+        resp.content = b"{}"
         provider.client.zone_get = MagicMock(
             return_value={
                 'data': [
@@ -201,23 +1255,13 @@ class TestAutoDNSProvider(TestCase):
                                 "ttl": 600,
                                 "type": "NS",
                                 "value": "a.unit-tests.net.",
-                            }
-                        ],
-                        'rems': [],
-                    },
-                ),
-                call(
-                    'POST',
-                    '/zone/unit.tests./_stream',
-                    None,
-                    {
-                        'adds': [
+                            },
                             {
                                 "name": "test-ns",
                                 "ttl": 600,
                                 "type": "NS",
                                 "value": "b.unit-tests.net.",
-                            }
+                            },
                         ],
                         'rems': [],
                     },
@@ -264,40 +1308,20 @@ class TestAutoDNSProvider(TestCase):
                                 "name": "",
                                 "ttl": 600,
                                 "type": "CAA",
-                                "value": "0 issue \"letsencrypt.org\"",
-                            }
-                        ],
-                        'rems': [],
-                    },
-                ),
-                call(
-                    'POST',
-                    '/zone/unit.tests./_stream',
-                    None,
-                    {
-                        'adds': [
+                                "value": "0 iodef \"mailto:webmaster@unit.tests\"",
+                            },
                             {
                                 "name": "",
                                 "ttl": 600,
                                 "type": "CAA",
-                                "value": "0 issuewild \"letsencrypt.org\"",
-                            }
-                        ],
-                        'rems': [],
-                    },
-                ),
-                call(
-                    'POST',
-                    '/zone/unit.tests./_stream',
-                    None,
-                    {
-                        'adds': [
+                                "value": "0 issue \"letsencrypt.org\"",
+                            },
                             {
                                 "name": "",
                                 "ttl": 600,
                                 "type": "CAA",
-                                "value": "0 iodef \"mailto:webmaster@unit.tests\"",
-                            }
+                                "value": "0 issuewild \"letsencrypt.org\"",
+                            },
                         ],
                         'rems': [],
                     },
@@ -403,13 +1427,21 @@ class TestAutoDNSProvider(TestCase):
             ],
             any_order=True,
         )
-        self.assertEqual(20, provider.client._do.call_count)
+        # one request per change
+        self.assertEqual(15, provider.client._do.call_count)
+
+        # sequential applies send the same requests
+        provider.client._do.reset_mock()
+        provider.max_workers = 1
+        plan = provider.plan(self.expected)
+        provider.apply(plan)
+        self.assertEqual(15, provider.client._do.call_count)
 
         provider.client._do.reset_mock()
 
         provider = AutoDNSProvider("test", "username", "password", 4)
         resp = Mock()
-        resp.json = Mock()
+        resp.content = b"{}"
         provider.client._do = Mock(return_value=resp)
 
         provider.client.zone_get = MagicMock(
@@ -455,7 +1487,8 @@ class TestAutoDNSProvider(TestCase):
 
         self.assertFalse(plan.exists)
 
-        provider.client._do.assert_has_calls(
+        # the delete goes first, the update replaces the record in one request
+        self.assertEqual(
             [
                 call(
                     'POST',
@@ -465,7 +1498,7 @@ class TestAutoDNSProvider(TestCase):
                         'adds': [],
                         'rems': [
                             {
-                                "name": "one",
+                                "name": "two",
                                 "ttl": 600,
                                 "type": "A",
                                 "value": "1.2.3.4",
@@ -486,18 +1519,9 @@ class TestAutoDNSProvider(TestCase):
                                 "value": "5.6.7.8",
                             }
                         ],
-                        'rems': [],
-                    },
-                ),
-                call(
-                    'POST',
-                    '/zone/unit.tests./_stream',
-                    None,
-                    {
-                        'adds': [],
                         'rems': [
                             {
-                                "name": "two",
+                                "name": "one",
                                 "ttl": 600,
                                 "type": "A",
                                 "value": "1.2.3.4",
@@ -506,5 +1530,5 @@ class TestAutoDNSProvider(TestCase):
                     },
                 ),
             ],
-            any_order=True,
+            provider.client._do.call_args_list,
         )